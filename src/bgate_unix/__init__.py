@@ -1,6 +1,20 @@
 """bgate-unix: High-performance Unix file deduplication engine."""
 
-from bgate_unix.engine import DedupeResult, FileDeduplicator, ProcessResult
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from bgate_unix.engine import DedupeResult, FileDeduplicator, ProcessResult
 
 __version__ = "0.5.1"
 __all__ = ["DedupeResult", "FileDeduplicator", "ProcessResult"]
+
+
+def __getattr__(name: str) -> object:
+    # Resolve engine exports on first use so `bgate --version` skips the engine import
+    if name in __all__:
+        from bgate_unix import engine
+
+        return getattr(engine, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
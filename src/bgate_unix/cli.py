@@ -1,23 +1,27 @@
 """CLI for bgate-unix.
 
 Exposes the deduplication engine to the shell with high-performance defaults.
+The engine, loguru and the heavier rich modules are imported inside the commands
+that use them, so --version and --help stay fast.
 """
 
 from __future__ import annotations
 
 import json
+import sys
+import time
+from enum import StrEnum
+from json.encoder import encode_basestring_ascii
 from pathlib import Path
-from typing import Annotated
+from typing import TYPE_CHECKING, Annotated
 
 import typer
-from loguru import logger
 from rich.console import Console
-from rich.logging import RichHandler
-from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
-from rich.table import Table
 
 from bgate_unix import __version__
-from bgate_unix.engine import DedupeResult, FileDeduplicator
+
+if TYPE_CHECKING:
+    from bgate_unix.engine import ProcessResult
 
 app = typer.Typer(
     name="bgate",
@@ -26,10 +30,16 @@ app = typer.Typer(
     rich_markup_mode="rich",
 )
 console = Console()
+PROGRESS_INTERVAL = 0.1  # Seconds between progress description updates
+# Reused for every NDJSON line; json.dumps builds a new encoder whenever it gets options
+_LINE_ENCODER = json.JSONEncoder(separators=(",", ":"), check_circular=False)
 
 
 def setup_logging(verbose: bool, json_mode: bool = False) -> None:
     """Configure loguru for terminal output. Stderr for logs if JSON mode."""
+    from loguru import logger
+    from rich.logging import RichHandler
+
     logger.remove()
     level = "ERROR" if json_mode and not verbose else ("DEBUG" if verbose else "WARNING")
 
@@ -46,6 +56,45 @@ def setup_logging(verbose: bool, json_mode: bool = False) -> None:
     )
 
 
+class JsonFormat(StrEnum):
+    """Layout of --json output."""
+
+    ARRAY = "array"
+    NDJSON = "ndjson"
+
+
+def _result_record(r: ProcessResult) -> dict[str, object]:
+    """JSON-ready view of one scan result."""
+    return {
+        "original_path": str(r.original_path),
+        "stored_path": str(r.path) if r.path else None,
+        "result": r.result.value,
+        "tier": r.tier,
+        "duplicate_of": str(r.duplicate_of) if r.duplicate_of else None,
+        "tags": r.tags,
+        "error": r.error,
+    }
+
+
+def _json_str(value: object | None) -> str:
+    return "null" if value is None else encode_basestring_ascii(str(value))
+
+
+def _result_line(r: ProcessResult) -> str:
+    """One NDJSON result line, specialized for the fixed record shape.
+
+    Byte-identical to encoding {"type": "result", **_result_record(r)} with
+    _LINE_ENCODER, without building the intermediate dict.
+    """
+    return (
+        f'{{"type":"result","original_path":{_json_str(r.original_path)},'
+        f'"stored_path":{_json_str(r.path or None)},"result":"{r.result.value}",'
+        f'"tier":{r.tier},"duplicate_of":{_json_str(r.duplicate_of)},'
+        f'"tags":{"null" if r.tags is None else _LINE_ENCODER.encode(r.tags)},'
+        f'"error":{_json_str(r.error)}}}\n'
+    )
+
+
 def version_callback(value: bool):
     """Print the version and exit."""
     if value:
@@ -88,10 +137,41 @@ def scan(
         list[str] | None, typer.Option("--ignore", "-i", help="Additional patterns to ignore.")
     ] = None,
     json_output: Annotated[
-        bool, typer.Option("--json", help="Output results in JSON format.")
+        bool,
+        typer.Option("--json", help="Output results as JSON (NDJSON unless --json-format array)."),
+    ] = False,
+    jobs: Annotated[
+        int,
+        typer.Option(
+            "--jobs",
+            "-j",
+            min=0,
+            help="Parallel workers for walking and hashing (0 = one per CPU).",
+        ),
+    ] = 1,
+    json_format: Annotated[
+        JsonFormat,
+        typer.Option(
+            "--json-format",
+            help="ndjson streams one object per line; array prints a single document.",
+        ),
+    ] = JsonFormat.NDJSON,
+    bulk: Annotated[
+        bool,
+        typer.Option(
+            "--bulk",
+            help="Into an empty index, rebuild the hash index once at the end. "
+            "Locks other readers and writers out of the database until the scan ends.",
+        ),
     ] = False,
 ) -> None:
     """Scan files for duplicates and optionally move unique files."""
+    from loguru import logger
+    from rich.progress import Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
+    from rich.table import Table
+
+    from bgate_unix.engine import DedupeResult, FileDeduplicator
+
     verbose = ctx.parent.params.get("verbose", False) if ctx and ctx.parent else False
     setup_logging(verbose, json_mode=json_output)
 
@@ -134,7 +214,9 @@ def scan(
 
     try:
         with FileDeduplicator(db, processing_dir=active_processing_dir) as deduper:
-            results = []
+            counts = dict.fromkeys(DedupeResult, 0)
+            # Only the JSON array report needs every result; other modes need counts alone
+            results: list[ProcessResult] = []
 
             if not json_output:
                 with Progress(
@@ -145,74 +227,83 @@ def scan(
                     transient=True,
                 ) as progress:
                     task = progress.add_task(f'Scanning "{path}"...', total=None)
+                    last_update = 0.0
 
                     if path.is_file():
-                        res = deduper.process_file(path, tags=parsed_tags)
-                        results.append(res)
+                        counts[deduper.process_file(path, tags=parsed_tags).result] += 1
                     else:
                         for result in deduper.process_directory(
-                            path, recursive=recursive, ignore_patterns=ignore, tags=parsed_tags
+                            path,
+                            recursive=recursive,
+                            ignore_patterns=ignore,
+                            tags=parsed_tags,
+                            jobs=jobs,
+                            bulk=bulk,
                         ):
-                            results.append(result)
-                            progress.update(
-                                task,
-                                description=f'Scanning: [cyan]"{result.original_path.name}"[/cyan]',
-                            )
+                            counts[result.result] += 1
+                            # Rich renders at ~10 Hz; skip updates nobody would see
+                            now = time.monotonic()
+                            if now - last_update >= PROGRESS_INTERVAL:
+                                last_update = now
+                                progress.update(
+                                    task,
+                                    description=f'Scanning: [cyan]"{result.original_path.name}"[/cyan]',
+                                )
             else:
+                stream_lines = json_format == JsonFormat.NDJSON
                 if path.is_file():
-                    results.append(deduper.process_file(path, tags=parsed_tags))
+                    scanned = iter([deduper.process_file(path, tags=parsed_tags)])
                 else:
-                    results = list(
-                        deduper.process_directory(
-                            path, recursive=recursive, ignore_patterns=ignore, tags=parsed_tags
-                        )
+                    scanned = deduper.process_directory(
+                        path,
+                        recursive=recursive,
+                        ignore_patterns=ignore,
+                        tags=parsed_tags,
+                        jobs=jobs,
+                        bulk=bulk,
                     )
+                for r in scanned:
+                    counts[r.result] += 1
+                    if stream_lines:
+                        sys.stdout.write(_result_line(r))
+                    else:
+                        results.append(r)
 
-            # Compile counts
-            unique_list = [r for r in results if r.result == DedupeResult.UNIQUE]
-            dupes_list = [r for r in results if r.result == DedupeResult.DUPLICATE]
-            skipped_list = [r for r in results if r.result == DedupeResult.SKIPPED]
+            unique_count = counts[DedupeResult.UNIQUE]
 
             if json_output:
-                output = {
-                    "summary": {
-                        "unique": len(unique_list),
-                        "duplicate": len(dupes_list),
-                        "skipped": len(skipped_list),
-                        "total": len(results),
-                    },
-                    "results": [
-                        {
-                            "original_path": str(r.original_path),
-                            "stored_path": str(r.path) if r.path else None,
-                            "result": r.result.value,
-                            "tier": r.tier,
-                            "duplicate_of": str(r.duplicate_of) if r.duplicate_of else None,
-                            "tags": r.tags if hasattr(r, "tags") else None,
-                            "error": r.error,
-                        }
-                        for r in results
-                    ],
+                summary = {
+                    "unique": unique_count,
+                    "duplicate": counts[DedupeResult.DUPLICATE],
+                    "skipped": counts[DedupeResult.SKIPPED],
+                    "total": sum(counts.values()),
                 }
-                print(json.dumps(output, indent=2))
+                if json_format == JsonFormat.NDJSON:
+                    sys.stdout.write(_LINE_ENCODER.encode({"type": "summary", **summary}) + "\n")
+                else:
+                    output = {
+                        "summary": summary,
+                        "results": [_result_record(r) for r in results],
+                    }
+                    print(json.dumps(output, indent=2))
             else:
                 table = Table(title="Deduplication Summary", box=None, show_header=True)
                 table.add_column("Result", style="cyan")
                 table.add_column("Count", justify="right", style="magenta")
 
-                table.add_row("Unique", str(len(unique_list)))
-                table.add_row("Duplicate", str(len(dupes_list)))
-                table.add_row("Skipped", str(len(skipped_list)))
+                table.add_row("Unique", str(unique_count))
+                table.add_row("Duplicate", str(counts[DedupeResult.DUPLICATE]))
+                table.add_row("Skipped", str(counts[DedupeResult.SKIPPED]))
 
                 console.print(table)
 
-                if is_dry_run and processing_dir and len(unique_list) > 0:
+                if is_dry_run and processing_dir and unique_count > 0:
                     console.print(
-                        f'\n[bold yellow]Dry run summary:[/bold yellow] {len(unique_list)} files would be moved to "{processing_dir}"'
+                        f'\n[bold yellow]Dry run summary:[/bold yellow] {unique_count} files would be moved to "{processing_dir}"'
                     )
-                elif processing_dir and len(unique_list) > 0:
+                elif processing_dir and unique_count > 0:
                     console.print(
-                        f'\n[bold green]Success:[/bold green] {len(unique_list)} files moved to "{processing_dir}"'
+                        f'\n[bold green]Success:[/bold green] {unique_count} files moved to "{processing_dir}"'
                     )
 
     except Exception as e:
@@ -230,6 +321,11 @@ def recover(
     ),
 ) -> None:
     """Attempt to recover orphaned files from previous interrupted operations."""
+    from loguru import logger
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+
+    from bgate_unix.engine import FileDeduplicator
+
     try:
         with FileDeduplicator(db) as deduper:
             with Progress(
@@ -259,10 +355,16 @@ def stats(
         "dedupe.db"
     ),
     json_output: Annotated[
-        bool, typer.Option("--json", help="Output results in JSON format.")
+        bool,
+        typer.Option("--json", help="Output results as JSON (NDJSON unless --json-format array)."),
     ] = False,
 ) -> None:
     """Show database statistics and index health."""
+    from loguru import logger
+    from rich.table import Table
+
+    from bgate_unix.engine import FileDeduplicator
+
     verbose = ctx.parent.params.get("verbose", False) if ctx and ctx.parent else False
     setup_logging(verbose, json_mode=json_output)
     try:
@@ -278,6 +380,7 @@ def stats(
                 table.add_row("Unique Sizes", str(s["unique_sizes"]))
                 table.add_row("Fringe Entries", str(s["fringe_entries"]))
                 table.add_row("Full Entries", str(s["full_entries"]))
+                table.add_row("Pending Hashes", str(s["pending_hashes"]))
                 table.add_row("Schema Version", f"v{s['schema_version']}")
                 table.add_row("Pending Orphans", str(s["orphan_count"]))
                 table.add_row("Pending Journal", str(s["pending_journal"]))
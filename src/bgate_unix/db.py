@@ -1,13 +1,19 @@
 """Database schema and connection management for bgate-unix.
 
-Uses sqlite-utils for schema management and BLOB-based hash storage.
-Schema v3 - implements mandatory schema_version tracking.
+Uses sqlite-utils for schema management; fringe hashes are stored as signed
+INTEGERs and full hashes as BLOBs.
+Schema v11 - implements mandatory schema_version tracking.
 """
 
 from __future__ import annotations
 
+import json
+import os
+import sqlite3
 import sys
-from datetime import UTC, datetime
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 from typing import TYPE_CHECKING, Self
 
@@ -15,21 +21,304 @@ from loguru import logger
 from sqlite_utils import Database
 
 if TYPE_CHECKING:
-    from collections.abc import Iterator
+    from collections.abc import Callable, Generator, Iterable, Iterator
 
 # Unix-only enforcement
 if sys.platform == "win32":
     sys.exit("bgate-unix is Unix-only. Windows is not supported.")
 
-CURRENT_SCHEMA_VERSION = 4
+CURRENT_SCHEMA_VERSION = 11
+DEFAULT_BATCH_SIZE = 1000  # Units of work per commit inside batch()
+PAGE_SIZE = 8192  # New databases only: wider B-tree fanout for BLOB keys + paths
+CHECKPOINT_INTERVAL = 2.0  # Seconds between background WAL checkpoints
+WAL_AUTOCHECKPOINT = 1000  # SQLite's default, restored after background checkpointing
+VACUUM_PAGES = 1000  # Free pages returned to the filesystem per close
+STATEMENT_CACHE_SIZE = 256  # Prepared statements kept per connection (sqlite3 default: 128)
+FETCH_SIZE = 1024  # Rows pulled per fetchmany() when streaming a table
+FILTER_BITS_PER_ENTRY = 16  # Bloom filter sizing: ~0.2% false positives at 4 probes
+FILTER_PROBES = 4
+FILTER_MIN_ENTRIES = 1 << 16
+# Batch lookups per indexed row before a filter is built: loading one costs about
+# half an indexed probe per row, so it pays off only after as many lookups
+FILTER_LOOKUPS_PER_ROW = 0.5
+
+HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Hot-path statements. sqlite3 caches prepared statements by SQL text, so every
+# call site must pass the identical string to reuse the compiled program.
+SIZE_LOOKUP_SQL = "SELECT file_path, metadata FROM size_index WHERE file_size = ?"
+SIZE_EXISTS_SQL = "SELECT 1 FROM size_index WHERE file_size = ?"
+# One statement for any number of sizes: the list is bound as a single JSON array
+SIZES_EXIST_SQL = (
+    "SELECT file_size FROM size_index WHERE file_size IN (SELECT value FROM json_each(?))"
+)
+SIZE_INSERT_SQL = (
+    "INSERT OR IGNORE INTO size_index (file_size, file_path, metadata) VALUES (?, ?, ?)"
+)
+SIZE_CLEAR_PENDING_SQL = (
+    "UPDATE size_index SET file_path = NULL, metadata = NULL WHERE file_size = ?"
+)
+FRINGE_EXISTS_SQL = "SELECT 1 FROM fringe_index WHERE fringe_hash = ? AND file_size = ?"
+FRINGE_INSERT_SQL = (
+    "INSERT INTO fringe_index (fringe_hash, file_size) VALUES (?, ?) ON CONFLICT DO NOTHING"
+)
+FULL_LOOKUP_SQL = "SELECT file_path FROM full_index WHERE full_hash = ?"
+FULL_INSERT_SQL = (
+    "INSERT INTO full_index (full_hash, file_path, metadata) VALUES (?, ?, ?) "
+    "ON CONFLICT DO NOTHING"
+)
+JOURNAL_INSERT_SQL = (
+    "INSERT INTO move_journal (source_path, dest_path, file_size, created_at, phase) "
+    "VALUES (?, ?, ?, ?, 'planned')"
+)
+ORPHAN_UPSERT_SQL = (
+    "INSERT INTO orphan_registry (original_path, orphan_path, file_size, created_at, status) "
+    "VALUES (?, ?, ?, ?, 'pending') "
+    "ON CONFLICT(orphan_path) DO UPDATE SET status = status RETURNING id"
+)
+# Terminal rows are never rewritten; rowcount tells the caller whether the transition applied
+JOURNAL_PHASE_SQL = (
+    "UPDATE move_journal SET phase = ?, completed_at = ? "
+    "WHERE id = ? AND phase NOT IN ('completed', 'failed')"
+)
+# Every count reported by stats, in one statement and one result row. The index
+# counts come from row_counts; the recovery counts only touch their partial indexes.
+COUNTS_SQL = """
+    SELECT
+        (SELECT value FROM row_counts WHERE name = 'size_index'),
+        (SELECT value FROM row_counts WHERE name = 'fringe_index'),
+        (SELECT value FROM row_counts WHERE name = 'full_index'),
+        (SELECT value FROM row_counts WHERE name = 'pending_hashes'),
+        (SELECT COUNT(*) FROM orphan_registry WHERE status = 'pending'),
+        (SELECT COUNT(*) FROM move_journal WHERE phase NOT IN ('completed', 'failed'))
+"""
+ORPHAN_STATUS_SQL = (
+    "UPDATE orphan_registry SET status = ?, recovered_at = ? WHERE id = ? AND status = 'pending'"
+)
+ORPHAN_STATUSES_SQL = (
+    "UPDATE orphan_registry SET status = ?, recovered_at = ?"
+    " WHERE status = 'pending' AND id IN (SELECT value FROM json_each(?))"
+)
+
+# Tier 1. file_path/metadata are set while the only file of that size is still
+# unhashed, and cleared once it is promoted to Tiers 2/3.
+SIZE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS size_index (
+        file_size INTEGER PRIMARY KEY,
+        file_path TEXT,
+        metadata TEXT
+    ) WITHOUT ROWID
+"""
+# Tier 2 only asks "seen before?", so fringe_index is its own key: one narrow B-tree.
+# The 8-byte fringe digest is stored as a signed INTEGER (see _fringe_int).
+FRINGE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS fringe_index (
+        fringe_hash INTEGER NOT NULL,
+        file_size INTEGER NOT NULL,
+        PRIMARY KEY (fringe_hash, file_size)
+    ) WITHOUT ROWID
+"""
+# full_index carries paths and metadata: a rowid table, so inserts append to the
+# rowid B-tree and only the narrow unique index takes a random-key descent.
+FULL_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS full_index (
+        full_hash BLOB NOT NULL,
+        file_path TEXT NOT NULL,
+        metadata TEXT
+    )
+"""
+# Recovery tables. id is a plain rowid alias: rows are never deleted, so ids are
+# never reused and AUTOINCREMENT's sqlite_sequence bookkeeping buys nothing.
+ORPHAN_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS orphan_registry (
+        id INTEGER PRIMARY KEY,
+        original_path TEXT NOT NULL,
+        orphan_path TEXT NOT NULL,
+        file_size INTEGER NOT NULL,
+        created_at TEXT NOT NULL,
+        recovered_at TEXT,
+        status TEXT NOT NULL DEFAULT 'pending',
+        UNIQUE(orphan_path)
+    )
+"""
+JOURNAL_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS move_journal (
+        id INTEGER PRIMARY KEY,
+        source_path TEXT NOT NULL,
+        dest_path TEXT NOT NULL,
+        file_size INTEGER NOT NULL,
+        created_at TEXT NOT NULL,
+        phase TEXT NOT NULL DEFAULT 'planned',
+        completed_at TEXT
+    )
+"""
+# Row counts for stats, kept current by the COUNTER_TRIGGERS below instead of
+# COUNT(*) scans that grow with the indexes.
+COUNTER_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS row_counts (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    ) WITHOUT ROWID
+"""
+VERSION_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        applied_at TEXT NOT NULL
+    )
+"""
+# Whole schema as one script: a single parse on connect, no per-table probes
+SCHEMA_SQL = ";".join(
+    (
+        SIZE_TABLE_SQL,
+        FRINGE_TABLE_SQL,
+        FULL_TABLE_SQL,
+        ORPHAN_TABLE_SQL,
+        JOURNAL_TABLE_SQL,
+        COUNTER_TABLE_SQL,
+        VERSION_TABLE_SQL,
+    )
+)
+
+# row_counts name -> COUNT(*) query it mirrors; used to (re)seed the counters
+COUNTED_ROWS = {
+    "size_index": "SELECT COUNT(*) FROM size_index",
+    "fringe_index": "SELECT COUNT(*) FROM fringe_index",
+    "full_index": "SELECT COUNT(*) FROM full_index",
+    "pending_hashes": "SELECT COUNT(*) FROM size_index WHERE file_path IS NOT NULL",
+}
+# Conflict-ignored inserts fire no trigger, so only real row changes are counted
+COUNTER_TRIGGERS = {
+    "size_index_ai": "AFTER INSERT ON size_index BEGIN"
+    " UPDATE row_counts SET value = value + 1 WHERE name = 'size_index';"
+    " UPDATE row_counts SET value = value + 1"
+    " WHERE name = 'pending_hashes' AND NEW.file_path IS NOT NULL; END",
+    "size_index_ad": "AFTER DELETE ON size_index BEGIN"
+    " UPDATE row_counts SET value = value - 1 WHERE name = 'size_index';"
+    " UPDATE row_counts SET value = value - 1"
+    " WHERE name = 'pending_hashes' AND OLD.file_path IS NOT NULL; END",
+    "size_index_au": "AFTER UPDATE OF file_path ON size_index BEGIN"
+    " UPDATE row_counts"
+    " SET value = value + (NEW.file_path IS NOT NULL) - (OLD.file_path IS NOT NULL)"
+    " WHERE name = 'pending_hashes'; END",
+    "fringe_index_ai": "AFTER INSERT ON fringe_index BEGIN"
+    " UPDATE row_counts SET value = value + 1 WHERE name = 'fringe_index'; END",
+    "fringe_index_ad": "AFTER DELETE ON fringe_index BEGIN"
+    " UPDATE row_counts SET value = value - 1 WHERE name = 'fringe_index'; END",
+    "full_index_ai": "AFTER INSERT ON full_index BEGIN"
+    " UPDATE row_counts SET value = value + 1 WHERE name = 'full_index'; END",
+    "full_index_ad": "AFTER DELETE ON full_index BEGIN"
+    " UPDATE row_counts SET value = value - 1 WHERE name = 'full_index'; END",
+}
+
+# (index, table, key columns) for the unique hash indexes
+HASH_INDEXES = (("idx_full_hash", "full_index", "full_hash"),)
+# Partial indexes over just the rows recovery still has to visit: the WHERE
+# clauses must match the recovery queries verbatim for the planner to use them.
+RECOVERY_INDEXES_SQL = (
+    "CREATE INDEX IF NOT EXISTS idx_orphan_pending ON orphan_registry(id) WHERE status = 'pending'",
+    "CREATE INDEX IF NOT EXISTS idx_journal_incomplete ON move_journal(id) "
+    "WHERE phase NOT IN ('completed', 'failed')",
+)
+
+
+_iso_second: tuple[int, str] = (0, "")
+
+
+def _now_iso() -> str:
+    """UTC timestamp in datetime.isoformat() form, reusing the formatted second.
+
+    About 3x cheaper than datetime.now(UTC).isoformat(); called for every journal row.
+    """
+    global _iso_second
+    seconds, nanos = divmod(time.time_ns(), 1_000_000_000)
+    cached_seconds, prefix = _iso_second
+    if seconds != cached_seconds:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds))
+        _iso_second = (seconds, prefix)
+    return f"{prefix}.{nanos // 1000:06d}+00:00"
+
+
+class _HashFilter:
+    """Bloom filter over 64-bit keys cut from hash digests.
+
+    Lets a lookup answer "not indexed" without a SQLite round-trip. Keys are
+    already uniform (xxhash output), so probes are derived by double hashing
+    the key's two halves rather than rehashing.
+    """
+
+    __slots__ = ("_bits", "_mask", "capacity", "count")
+
+    def __init__(self, capacity: int) -> None:
+        nbits = 1 << (capacity * FILTER_BITS_PER_ENTRY - 1).bit_length()
+        self._bits = bytearray(nbits >> 3)
+        self._mask = nbits - 1
+        self.capacity = capacity
+        self.count = 0
+
+    def add(self, key: int) -> None:
+        bits, mask = self._bits, self._mask
+        pos, step = key & 0xFFFFFFFF, (key >> 32) | 1
+        for _ in range(FILTER_PROBES):
+            bits[(pos & mask) >> 3] |= 1 << (pos & 7)
+            pos += step
+        self.count += 1
+
+    def __contains__(self, key: int) -> bool:
+        bits, mask = self._bits, self._mask
+        pos, step = key & 0xFFFFFFFF, (key >> 32) | 1
+        for _ in range(FILTER_PROBES):
+            if not bits[(pos & mask) >> 3] & (1 << (pos & 7)):
+                return False
+            pos += step
+        return True
+
+
+def _fringe_int(fringe_hash: bytes) -> int:
+    """Fringe digest as the signed 64-bit INTEGER it is stored as.
+
+    Digests are xxh3_64 (8 bytes); anything longer is cut to 8 bytes, which at
+    worst sends a false fringe match on to the Tier 3 comparison.
+    """
+    return int.from_bytes(fringe_hash[:8], "little", signed=True)
+
+
+def _fringe_key(fringe_int: int, file_size: int) -> int:
+    return (fringe_int ^ (file_size * 0x9E3779B97F4A7C15)) & ((1 << 64) - 1)
+
+
+def _full_key(full_hash: bytes) -> int:
+    return int.from_bytes(full_hash[:8], "little")
 
 
 class DedupeDatabase:
-    """SQLite database for deduplication index using sqlite-utils."""
+    """SQLite database for the deduplication index.
+
+    sqlite-utils handles connection setup and schema management; every query and
+    write goes straight to the underlying sqlite3 connection.
+    """
 
     def __init__(self, db_path: Path | str) -> None:
         self._db_path = Path(db_path)
         self._db: Database | None = None
+        self._conn: sqlite3.Connection | None = None
+        self._cursor: sqlite3.Cursor | None = None
+        self._batch_size: int | None = None
+        self._batch_units = 0
+        self._savepoint_depth = 0
+        self._wal_fd: int | None = None
+        self._wal = False
+        self._checkpointer: threading.Thread | None = None
+        # bulk_mode(): full hashes indexed this run, standing in for the dropped index
+        self._bulk_full: dict[bytes, str] | None = None
+        self._bulk_unit: list[bytes] = []
+        # Negative-lookup filters, loaded inside a batch once its lookups would pay
+        # for the table scan and dropped when it ends; until then lookups query the
+        # index. A filter that misses rows written by another connection only defers
+        # the catch to the unique constraint.
+        self._fringe_filter: _HashFilter | None = None
+        self._full_filter: _HashFilter | None = None
+        # table -> index probes this batch may still make before loading its filter
+        self._filter_budget: dict[str, int] = {}
 
     @property
     def db_path(self) -> Path:
@@ -37,11 +326,15 @@ class DedupeDatabase:
 
     def connect(self) -> None:
         """Establish database connection and initialize schema."""
-        self._db = Database(self._db_path)
-        self._apply_pragmas()
+        # Own the connection so the prepared-statement cache can be sized
+        conn = sqlite3.connect(self._db_path, cached_statements=STATEMENT_CACHE_SIZE)
+        self._db = Database(conn)
+        self._conn = conn
+        self._cursor = conn.cursor()
+        tables = self._db.table_names()
+        self._apply_pragmas(new_database=not tables)
 
         # Safety: Check for legacy tables without version tracking
-        tables = self._db.table_names()
         if tables and "schema_version" not in tables:
             logger.error(
                 "Legacy or incompatible database detected (missing schema_version). "
@@ -51,8 +344,10 @@ class DedupeDatabase:
 
         self._create_schema()
         self._enforce_schema_version()
+        self._create_indexes()
+        self._create_counters()
 
-    def _apply_pragmas(self) -> None:
+    def _apply_pragmas(self, new_database: bool = False) -> None:
         if self._db is None:
             return
         conn = self._db.conn
@@ -60,10 +355,25 @@ class DedupeDatabase:
             return
         # Set isolation_level to None for manual transaction control
         conn.isolation_level = None
-        self._db.execute("PRAGMA journal_mode = WAL")
-        self._db.execute("PRAGMA synchronous = FULL")
+        if new_database:
+            # Page size and auto_vacuum are fixed once the file has content or switches to WAL
+            self._db.execute(f"PRAGMA page_size = {PAGE_SIZE}")
+            self._db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        mode = self._db.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+        self._wal = str(mode).lower() == "wal"
+        if self._wal:
+            # NORMAL: commits append to the WAL without fsync; commit(durable=True) syncs it
+            self._db.execute("PRAGMA synchronous = NORMAL")
+        else:
+            # No WAL file to sync on demand, so every commit has to be durable by itself
+            logger.warning(
+                "WAL journal mode unavailable for {} (got {!r}); using synchronous=FULL",
+                self._db_path,
+                mode,
+            )
+            self._db.execute("PRAGMA synchronous = FULL")
         self._db.execute("PRAGMA busy_timeout = 5000")
-        self._db.execute("PRAGMA cache_size = -64000")
+        self._db.execute("PRAGMA cache_size = -65536")
         self._db.execute("PRAGMA temp_store = MEMORY")
         self._db.execute("PRAGMA mmap_size = 268435456")
 
@@ -96,92 +406,167 @@ class DedupeDatabase:
             logger.info("Adding metadata column to full_index table")
             self._db.execute("ALTER TABLE full_index ADD COLUMN metadata TEXT")
 
+        if from_version < 5:
+            # v5 switched the fringe hash from xxh64 to xxh3_64; old digests can never match.
+            # The engine rebuilds the fringe index from full_index paths on connect.
+            logger.info("Clearing legacy xxh64 fringe_index entries")
+            self._db.execute("DELETE FROM fringe_index")
+
+        if from_version < 6:
+            # v6 defers hashing of size-unique files; existing rows are already hashed (NULL)
+            columns = self._db["size_index"].columns_dict
+            for column in ("file_path", "metadata"):
+                if column not in columns:
+                    logger.info("Adding {} column to size_index table", column)
+                    self._db.execute(f"ALTER TABLE size_index ADD COLUMN {column} TEXT")
+
+        if from_version < 7:
+            # v7 moved full_index from WITHOUT ROWID to a rowid table + unique index
+            self._rebuild_table("full_index", FULL_TABLE_SQL, "full_hash, file_path, metadata")
+
+        if from_version < 8:
+            # v8 dropped the redundant file_path column from fringe_index
+            self._rebuild_table("fringe_index", FRINGE_TABLE_SQL, "fringe_hash, file_size")
+
+        if from_version < 9:
+            # v9 dropped AUTOINCREMENT from the recovery tables
+            self._rebuild_table(
+                "orphan_registry",
+                ORPHAN_TABLE_SQL,
+                "id, original_path, orphan_path, file_size, created_at, recovered_at, status",
+            )
+            self._rebuild_table(
+                "move_journal",
+                JOURNAL_TABLE_SQL,
+                "id, source_path, dest_path, file_size, created_at, phase, completed_at",
+            )
+
+        if from_version < 10:
+            # v10 stores fringe hashes as INTEGER instead of 8-byte BLOBs
+            self._convert_fringe_hashes()
+
+        # v11 added row_counts; _create_counters() seeds it once migrations are done
+
         # Update schema version
         self._db.execute(
             "INSERT INTO schema_version (version, applied_at) VALUES (?, ?)",
-            [CURRENT_SCHEMA_VERSION, datetime.now(UTC).isoformat()],
+            [CURRENT_SCHEMA_VERSION, _now_iso()],
         )
         logger.info("Schema migration to v{} completed", CURRENT_SCHEMA_VERSION)
 
-    def _create_schema(self) -> None:
-        if self._db is None:
+    def _rebuild_table(self, table: str, create_sql: str, columns: str) -> None:
+        """Recreate a table with its current definition, keeping `columns` of every row."""
+        logger.info("Rebuilding {} table", table)
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+            conn.execute(create_sql)
+            conn.execute(
+                f"INSERT OR IGNORE INTO {table} ({columns}) SELECT {columns} FROM {table}_old"
+            )
+            conn.execute(f"DROP TABLE {table}_old")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _convert_fringe_hashes(self) -> None:
+        """Rewrite BLOB fringe hashes as signed integers (v10 migration)."""
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute("SELECT fringe_hash, file_size FROM fringe_index").fetchall()
+            conn.execute("DROP TABLE fringe_index")
+            conn.execute(FRINGE_TABLE_SQL)
+            conn.executemany(
+                FRINGE_INSERT_SQL,
+                ((_fringe_int(fringe_hash), file_size) for fringe_hash, file_size in rows),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        logger.info("Converted {} fringe hashes to integers", len(rows))
+
+    def _create_indexes(self) -> None:
+        # After migrations, so an index never lands on a table that is about to be rebuilt
+        for index, table, columns in HASH_INDEXES:
+            create_sql = f"CREATE UNIQUE INDEX IF NOT EXISTS {index} ON {table}({columns})"
+            try:
+                self.db.execute(create_sql)
+            except sqlite3.IntegrityError:
+                # Duplicates would mean two index rows claim one file; never pick a
+                # winner by deleting rows, leave the table as is for a human to repair
+                logger.error("{} has duplicate {} rows; not creating {}", table, columns, index)
+                raise
+        for create_sql in RECOVERY_INDEXES_SQL:
+            self.db.execute(create_sql)
+
+    def _create_counters(self) -> None:
+        """Install the row_counts triggers, seeding the counts whenever any are missing.
+
+        Table rebuilds in migrations drop a table's triggers, so this runs after
+        them and recounts in the same transaction that recreates the triggers.
+        """
+        conn = self.conn
+        present = conn.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN "
+            "(SELECT value FROM json_each(?))",
+            (json.dumps(list(COUNTER_TRIGGERS)),),
+        ).fetchone()[0]
+        if present == len(COUNTER_TRIGGERS):
             return
 
-        # Size index for Tier 1
-        if "size_index" not in self._db.table_names():
-            self._db.execute("""
-                CREATE TABLE size_index (
-                    file_size INTEGER PRIMARY KEY
-                ) WITHOUT ROWID
-            """)
-
-        # Fringe hash index for Tier 2 (BLOB)
-        if "fringe_index" not in self._db.table_names():
-            self._db.execute("""
-                CREATE TABLE fringe_index (
-                    fringe_hash BLOB NOT NULL,
-                    file_size INTEGER NOT NULL,
-                    file_path TEXT NOT NULL,
-                    PRIMARY KEY (fringe_hash, file_size)
-                ) WITHOUT ROWID
-            """)
-
-        # Full hash index for Tier 3 (BLOB) with metadata
-        if "full_index" not in self._db.table_names():
-            self._db.execute("""
-                CREATE TABLE full_index (
-                    full_hash BLOB PRIMARY KEY,
-                    file_path TEXT NOT NULL,
-                    metadata TEXT
-                ) WITHOUT ROWID
-            """)
-
-        # Orphan registry for crash recovery
-        if "orphan_registry" not in self._db.table_names():
-            self._db.execute("""
-                CREATE TABLE orphan_registry (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    original_path TEXT NOT NULL,
-                    orphan_path TEXT NOT NULL,
-                    file_size INTEGER NOT NULL,
-                    created_at TEXT NOT NULL,
-                    recovered_at TEXT,
-                    status TEXT NOT NULL DEFAULT 'pending',
-                    UNIQUE(orphan_path)
-                )
-            """)
-
-        # Move journal for crash recovery
-        if "move_journal" not in self._db.table_names():
-            self._db.execute("""
-                CREATE TABLE move_journal (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    source_path TEXT NOT NULL,
-                    dest_path TEXT NOT NULL,
-                    file_size INTEGER NOT NULL,
-                    created_at TEXT NOT NULL,
-                    phase TEXT NOT NULL DEFAULT 'planned',
-                    completed_at TEXT
-                )
-            """)
-
-        # Schema version
-        if "schema_version" not in self._db.table_names():
-            self._db.execute("""
-                CREATE TABLE schema_version (
-                    version INTEGER PRIMARY KEY,
-                    applied_at TEXT NOT NULL
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for name, body in COUNTER_TRIGGERS.items():
+                conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+                conn.execute(f"CREATE TRIGGER {name} {body}")
+            for name, count_sql in COUNTED_ROWS.items():
+                conn.execute(
+                    f"INSERT OR REPLACE INTO row_counts (name, value) VALUES (?, ({count_sql}))",
+                    (name,),
                 )
-            """)
-            self._db.execute(
-                "INSERT INTO schema_version (version, applied_at) VALUES (?, ?)",
-                [CURRENT_SCHEMA_VERSION, datetime.now(UTC).isoformat()],
-            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _create_schema(self) -> None:
+        self.conn.executescript(SCHEMA_SQL)
+        # Only a brand-new schema_version table is stamped; older ones go through migration
+        self.cursor.execute(
+            "INSERT INTO schema_version (version, applied_at) "
+            "SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM schema_version)",
+            (CURRENT_SCHEMA_VERSION, _now_iso()),
+        )
 
     def close(self) -> None:
         if self._db:
+            self._end_batch()
+            # Reclaim pages freed by deleted rows; skipped while recovery work is outstanding
+            if (
+                not self.conn.in_transaction
+                and not self.get_pending_journal_count()
+                and not self.get_orphan_count()
+            ):
+                self.incremental_vacuum()
+            # Let SQLite refresh planner statistics that this session made stale,
+            # sampling at most ~400 rows per index so close stays cheap on big indexes
+            try:
+                self._db.execute("PRAGMA analysis_limit = 400")
+                self._db.execute("PRAGMA optimize")
+            except sqlite3.Error as e:
+                logger.debug("PRAGMA optimize failed: {}", e)
             self._db.close()
             self._db = None
+            self._conn = self._cursor = None
+        self._fringe_filter = self._full_filter = None
+        self._filter_budget.clear()
+        if self._wal_fd is not None:
+            os.close(self._wal_fd)
+            self._wal_fd = None
 
     def __enter__(self) -> Self:
         self.connect()
@@ -197,96 +582,216 @@ class DedupeDatabase:
             raise RuntimeError("Database not connected")
         return self._db
 
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Raw connection for hot-path statements, skipping the sqlite-utils wrapper."""
+        if self._conn is None:
+            raise RuntimeError("Database not connected")
+        return self._conn
+
+    @property
+    def cursor(self) -> sqlite3.Cursor:
+        """Cursor reused by single-statement hot paths; consume its result before the next call.
+
+        Saves allocating a cursor per statement, which conn.execute() does.
+        """
+        if self._cursor is None:
+            raise RuntimeError("Database not connected")
+        return self._cursor
+
     @property
     def schema_version(self) -> int:
         try:
-            row = self.db.execute("SELECT MAX(version) FROM schema_version").fetchone()
+            row = self.conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
             return row[0] if row and row[0] else 0
         except Exception:
             return 0
 
+    @property
+    def fringe_rebuild_required(self) -> bool:
+        """True if full_index has entries but fringe_index is empty (e.g. after migration)."""
+        row = self.conn.execute(
+            "SELECT EXISTS(SELECT 1 FROM full_index) AND NOT EXISTS(SELECT 1 FROM fringe_index)"
+        ).fetchone()
+        return bool(row and row[0])
+
     # Tier 1: Size operations
     def size_exists(self, file_size: int) -> bool:
-        row = self.db.execute(
-            "SELECT 1 FROM size_index WHERE file_size = ?", [file_size]
-        ).fetchone()
+        row = self.cursor.execute(SIZE_EXISTS_SQL, (file_size,)).fetchone()
         return row is not None
 
-    def add_size(self, file_size: int) -> None:
-        self.db.execute(
-            "INSERT OR IGNORE INTO size_index (file_size) VALUES (?)",
-            [file_size],
-        )
+    def sizes_exist(self, file_sizes: Iterable[int]) -> set[int]:
+        """Return the subset of `file_sizes` already in the size index, in one query."""
+        rows = self.conn.execute(SIZES_EXIST_SQL, (json.dumps(list(file_sizes)),))
+        return {row[0] for row in rows}
 
-    # Tier 2: Fringe hash operations (BLOB)
-    def fringe_lookup(self, fringe_hash: bytes, file_size: int) -> str | None:
-        row = self.db.execute(
-            "SELECT file_path FROM fringe_index WHERE fringe_hash = ? AND file_size = ?",
-            [fringe_hash, file_size],
-        ).fetchone()
-        return row[0] if row else None
+    def size_lookup(self, file_size: int) -> tuple[str | None, str | None] | None:
+        """Return None for an unseen size, else (pending_path, pending_metadata).
 
-    def add_fringe(self, fringe_hash: bytes, file_size: int, file_path: str) -> bool:
-        cursor = self.db.execute(
-            """
-            INSERT INTO fringe_index (fringe_hash, file_size, file_path)
-            VALUES (?, ?, ?)
-            ON CONFLICT DO NOTHING
-            """,
-            [fringe_hash, file_size, file_path],
-        )
+        pending_path is None once the file of that size has been hashed and indexed.
+        """
+        row = self.cursor.execute(SIZE_LOOKUP_SQL, (file_size,)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def add_size(
+        self, file_size: int, file_path: str | None = None, metadata: str | None = None
+    ) -> None:
+        """Record a size; pass file_path to register the file as pending (unhashed)."""
+        self.cursor.execute(SIZE_INSERT_SQL, (file_size, file_path, metadata))
+
+    def clear_pending_size(self, file_size: int) -> None:
+        self.cursor.execute(SIZE_CLEAR_PENDING_SQL, (file_size,))
+
+    def get_counts(self) -> dict[str, int]:
+        """Row counts for stats: index sizes, pending hashes, orphans and open moves."""
+        sizes, fringes, fulls, pending, orphans, journal = self.conn.execute(COUNTS_SQL).fetchone()
+        return {
+            "unique_sizes": sizes,
+            "fringe_entries": fringes,
+            "full_entries": fulls,
+            "pending_hashes": pending,
+            "orphan_count": orphans,
+            "pending_journal": journal,
+        }
+
+    # Tier 2: Fringe hash operations (signed INTEGER)
+    def fringe_exists(self, fringe_hash: bytes, file_size: int) -> bool:
+        hash_filter = self._fringe_filter
+        if hash_filter is None or hash_filter.count >= hash_filter.capacity:
+            hash_filter = self._fringe_filter = self._reload_filter(
+                "fringe_index", "fringe_hash, file_size", _fringe_key, hash_filter
+            )
+        fringe_int = _fringe_int(fringe_hash)
+        if hash_filter is not None and _fringe_key(fringe_int, file_size) not in hash_filter:
+            return False
+        row = self.cursor.execute(FRINGE_EXISTS_SQL, (fringe_int, file_size)).fetchone()
+        return row is not None
+
+    def add_fringe(self, fringe_hash: bytes, file_size: int) -> bool:
+        fringe_int = _fringe_int(fringe_hash)
+        cursor = self.cursor.execute(FRINGE_INSERT_SQL, (fringe_int, file_size))
+        if self._fringe_filter is not None:
+            self._fringe_filter.add(_fringe_key(fringe_int, file_size))
         return cursor.rowcount > 0
 
+    def add_fringes(self, rows: list[tuple[bytes, int]]) -> int:
+        """Insert many (fringe_hash, file_size) rows in one statement run."""
+        int_rows = [(_fringe_int(fringe_hash), file_size) for fringe_hash, file_size in rows]
+        if self._fringe_filter is not None:
+            for fringe_int, file_size in int_rows:
+                self._fringe_filter.add(_fringe_key(fringe_int, file_size))
+        return self.conn.executemany(FRINGE_INSERT_SQL, int_rows).rowcount
+
     # Tier 3: Full hash operations (BLOB)
     def full_lookup(self, full_hash: bytes) -> str | None:
-        row = self.db.execute(
-            "SELECT file_path FROM full_index WHERE full_hash = ?", [full_hash]
-        ).fetchone()
+        if self._bulk_full is not None:
+            return self._bulk_full.get(full_hash)
+        hash_filter = self._full_filter
+        if hash_filter is None or hash_filter.count >= hash_filter.capacity:
+            hash_filter = self._full_filter = self._reload_filter(
+                "full_index", "full_hash", _full_key, hash_filter
+            )
+        if hash_filter is not None and _full_key(full_hash) not in hash_filter:
+            return None
+        row = self.cursor.execute(FULL_LOOKUP_SQL, (full_hash,)).fetchone()
         return row[0] if row else None
 
     def add_full(self, full_hash: bytes, file_path: str, metadata: str | None = None) -> bool:
-        if self._db is None:
-            raise RuntimeError("Database not connected")
+        cursor = self.cursor
+        if self._bulk_full is not None:
+            if full_hash in self._bulk_full:
+                return False
+            self._bulk_full[full_hash] = file_path
+            self._bulk_unit.append(full_hash)
 
-        cursor = self._db.execute(
-            """
-            INSERT INTO full_index (full_hash, file_path, metadata)
-            VALUES (?, ?, ?)
-            ON CONFLICT DO NOTHING
-            """,
-            [full_hash, file_path, metadata],
-        )
+        cursor.execute(FULL_INSERT_SQL, (full_hash, file_path, metadata))
+        if self._full_filter is not None:
+            self._full_filter.add(_full_key(full_hash))
         return cursor.rowcount > 0
 
+    def _reload_filter(
+        self,
+        table: str,
+        columns: str,
+        key: Callable[..., int],
+        current: _HashFilter | None,
+    ) -> _HashFilter | None:
+        """The filter a lookup on `table` should use, or None to probe the index.
+
+        Outside a batch there is none. Inside one, a filter is first built after
+        FILTER_LOOKUPS_PER_ROW lookups per indexed row; one that has filled up is
+        rebuilt at once, since the batch has already shown it pays.
+        """
+        if self._batch_size is None:
+            return None
+        if current is None:
+            budget = self._filter_budget.get(table)
+            if budget is None:
+                budget = int(self._indexed_rows(table) * FILTER_LOOKUPS_PER_ROW)
+            if budget > 0:
+                self._filter_budget[table] = budget - 1
+                return None
+        return self._load_filter(table, columns, key)
+
+    def _indexed_rows(self, table: str) -> int:
+        row = self.conn.execute("SELECT value FROM row_counts WHERE name = ?", (table,)).fetchone()
+        return row[0] if row else 0
+
+    def _load_filter(self, table: str, columns: str, key: Callable[..., int]) -> _HashFilter:
+        """Build a filter over every key in `table`, with room for as many again."""
+        conn = self.conn
+        count = self._indexed_rows(table)
+        hash_filter = _HashFilter(max(2 * count, FILTER_MIN_ENTRIES))
+        for row in conn.execute(f"SELECT {columns} FROM {table}"):
+            hash_filter.add(key(*row))
+        return hash_filter
+
     def get_all_paths(self) -> Iterator[str]:
-        for row in self.db.execute("SELECT DISTINCT file_path FROM full_index"):
-            yield row[0]
+        # Paths are almost always unique, so dedupe in a set instead of making
+        # SQLite sort the whole table into a temp B-tree for DISTINCT.
+        cursor = self.conn.execute("SELECT file_path FROM full_index")
+        seen: set[str] = set()
+        while rows := cursor.fetchmany(FETCH_SIZE):
+            for (file_path,) in rows:
+                if file_path not in seen:
+                    seen.add(file_path)
+                    yield file_path
 
     # Orphan registry
     def add_orphan(self, original_path: str, orphan_path: str, file_size: int) -> int:
-        self.db.execute(
+        params = (original_path, orphan_path, file_size, _now_iso())
+        if HAS_RETURNING:
+            # The no-op DO UPDATE makes RETURNING yield the existing row's id too
+            return self.cursor.execute(ORPHAN_UPSERT_SQL, params).fetchone()[0]
+
+        self.conn.execute(
             """
             INSERT INTO orphan_registry (original_path, orphan_path, file_size, created_at, status)
             VALUES (?, ?, ?, ?, 'pending')
             ON CONFLICT(orphan_path) DO NOTHING
             """,
-            [original_path, orphan_path, file_size, datetime.now(UTC).isoformat()],
+            params,
         )
         # Fetch the ID (either newly inserted or existing) to ensure idempotency
-        row = self.db.execute(
-            "SELECT id FROM orphan_registry WHERE orphan_path = ?", [orphan_path]
+        row = self.conn.execute(
+            "SELECT id FROM orphan_registry WHERE orphan_path = ?", (orphan_path,)
         ).fetchone()
         return row[0] if row else 0
 
-    def update_orphan_status(self, orphan_id: int, status: str) -> None:
-        recovered_at = datetime.now(UTC).isoformat() if status != "pending" else None
-        self.db.execute(
-            "UPDATE orphan_registry SET status = ?, recovered_at = ? WHERE id = ?",
-            [status, recovered_at, orphan_id],
-        )
+    def update_orphan_status(self, orphan_id: int, status: str) -> bool:
+        """Move a pending orphan to `status`; False if it was already resolved."""
+        recovered_at = _now_iso() if status != "pending" else None
+        cursor = self.cursor.execute(ORPHAN_STATUS_SQL, (status, recovered_at, orphan_id))
+        return cursor.rowcount > 0
+
+    def update_orphan_statuses(self, orphan_ids: Iterable[int], status: str) -> int:
+        """Move many pending orphans to `status` in one statement; returns how many moved."""
+        recovered_at = _now_iso() if status != "pending" else None
+        ids = json.dumps(list(orphan_ids))
+        return self.conn.execute(ORPHAN_STATUSES_SQL, (status, recovered_at, ids)).rowcount
 
     def get_pending_orphans(self) -> list[dict]:
-        rows = self.db.execute(
+        rows = self.conn.execute(
             """
             SELECT id, original_path, orphan_path, file_size, created_at
             FROM orphan_registry WHERE status = 'pending'
@@ -303,32 +808,35 @@ class DedupeDatabase:
             for r in rows
         ]
 
+    def iter_pending_orphans(self) -> Iterator[tuple[int, str, str]]:
+        """Stream (id, original_path, orphan_path) for pending orphans, FETCH_SIZE rows at a time."""
+        cursor = self.conn.execute(
+            "SELECT id, original_path, orphan_path FROM orphan_registry WHERE status = 'pending'"
+        )
+        while rows := cursor.fetchmany(FETCH_SIZE):
+            yield from rows
+
     def get_orphan_count(self) -> int:
-        row = self.db.execute(
+        row = self.conn.execute(
             "SELECT COUNT(*) FROM orphan_registry WHERE status = 'pending'"
         ).fetchone()
         return row[0] if row else 0
 
     # Move journal
     def journal_move(self, source_path: str, dest_path: str, file_size: int) -> int:
-        cursor = self.db.execute(
-            """
-            INSERT INTO move_journal (source_path, dest_path, file_size, created_at, phase)
-            VALUES (?, ?, ?, ?, 'planned')
-            """,
-            [source_path, dest_path, file_size, datetime.now(UTC).isoformat()],
+        cursor = self.cursor.execute(
+            JOURNAL_INSERT_SQL, (source_path, dest_path, file_size, _now_iso())
         )
         return cursor.lastrowid or 0
 
-    def update_move_phase(self, journal_id: int, phase: str) -> None:
-        completed_at = datetime.now(UTC).isoformat() if phase in ("completed", "failed") else None
-        self.db.execute(
-            "UPDATE move_journal SET phase = ?, completed_at = ? WHERE id = ?",
-            [phase, completed_at, journal_id],
-        )
+    def update_move_phase(self, journal_id: int, phase: str) -> bool:
+        """Advance an unfinished move to `phase`; False if it had already completed or failed."""
+        completed_at = _now_iso() if phase in ("completed", "failed") else None
+        cursor = self.cursor.execute(JOURNAL_PHASE_SQL, (phase, completed_at, journal_id))
+        return cursor.rowcount > 0
 
     def get_incomplete_journal_entries(self) -> list[dict]:
-        rows = self.db.execute(
+        rows = self.conn.execute(
             """
             SELECT id, source_path, dest_path, file_size, created_at, phase
             FROM move_journal WHERE phase NOT IN ('completed', 'failed')
@@ -347,22 +855,226 @@ class DedupeDatabase:
         ]
 
     def get_pending_journal_count(self) -> int:
-        row = self.db.execute(
+        row = self.conn.execute(
             "SELECT COUNT(*) FROM move_journal WHERE phase NOT IN ('completed', 'failed')"
         ).fetchone()
         return row[0] if row else 0
 
-    def begin_transaction(self) -> None:
-        conn = self.db.conn
-        if conn is not None and not conn.in_transaction:
+    def incremental_vacuum(self, pages: int = VACUUM_PAGES) -> None:
+        """Release up to `pages` free pages (no-op unless auto_vacuum is INCREMENTAL).
+
+        Must run outside a transaction: executescript() is used because a single
+        execute() step frees only one page.
+        """
+        self.conn.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+
+    def analyze(self) -> None:
+        """Gather full planner statistics, e.g. after a bulk load rebuilt the indexes."""
+        self.conn.execute("PRAGMA analysis_limit = 0")
+        self.conn.execute("ANALYZE")
+
+    def checkpoint(self) -> tuple[int, int, int]:
+        """Run a PASSIVE WAL checkpoint on a separate connection.
+
+        Returns (busy, wal_frames, checkpointed_frames) as reported by SQLite.
+        """
+        conn = sqlite3.connect(self._db_path)
+        try:
+            return conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        finally:
+            conn.close()
+
+    @contextmanager
+    def background_checkpoints(
+        self, interval: float = CHECKPOINT_INTERVAL
+    ) -> Generator[None, None, None]:
+        """Checkpoint the WAL from a helper thread instead of inside commits.
+
+        Automatic checkpoints are disabled for the duration, so no commit stalls
+        copying the WAL back into the database file; a daemon thread with its own
+        connection runs a PASSIVE checkpoint every `interval` seconds instead.
+        No-op when nested, and inside bulk_mode, whose exclusive lock would keep
+        that connection out; commits keep checkpointing themselves there.
+        """
+        if self._checkpointer is not None or self._bulk_full is not None:
+            yield
+            return
+
+        stop = threading.Event()
+
+        def run() -> None:
+            conn = sqlite3.connect(self._db_path)
+            try:
+                while not stop.wait(interval):
+                    try:
+                        conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+                    except sqlite3.Error as e:
+                        logger.debug("Background checkpoint failed: {}", e)
+            finally:
+                conn.close()
+
+        self.conn.execute("PRAGMA wal_autocheckpoint = 0")
+        self._checkpointer = threading.Thread(target=run, name="bgate-checkpoint", daemon=True)
+        self._checkpointer.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            self._checkpointer.join()
+            self._checkpointer = None
+            self.conn.execute(f"PRAGMA wal_autocheckpoint = {WAL_AUTOCHECKPOINT}")
+
+    @contextmanager
+    def bulk_mode(self) -> Generator[None, None, None]:
+        """Ingest into an empty full_index without maintaining its unique index.
+
+        Engages only when full_index has no rows; otherwise, and when nested, it is
+        a no-op. idx_full_hash is dropped on entry and rebuilt with one sorted pass
+        on exit; in between, lookups and uniqueness checks are served from an
+        in-memory map of the hashes inserted this run. Nothing else may write
+        full_index while its unique index is gone, so the connection holds an
+        exclusive lock (locking_mode=EXCLUSIVE) from the emptiness check until the
+        index is back; other connections, readers included, get SQLITE_BUSY for the
+        whole window. On exit, a unit left open is rolled back and completed units
+        are committed before the rebuild.
+        """
+        conn = self.conn
+        if self._bulk_full is not None or conn.in_transaction:
+            yield
+            return
+
+        conn.execute("PRAGMA locking_mode = EXCLUSIVE")
+        try:
+            # Takes the write lock, which exclusive mode keeps across later commits
             conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT EXISTS(SELECT 1 FROM full_index)").fetchone()
+                empty = not (row and row[0])
+                if empty:
+                    for index, _, _ in HASH_INDEXES:
+                        conn.execute(f"DROP INDEX IF EXISTS {index}")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+            if not empty:
+                yield
+                return
+
+            self._bulk_full = {}
+            try:
+                yield
+            finally:
+                self._bulk_full = None
+                self._bulk_unit.clear()
+                # A batch's ROLLBACK TO an open unit would undo the rebuilt index too
+                self._settle_units()
+                self._create_indexes()
+                self.analyze()
+        finally:
+            # The lock is only released on the next access after leaving exclusive mode
+            conn.execute("PRAGMA locking_mode = NORMAL")
+            conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone()
+
+    @contextmanager
+    def batch(self, size: int = DEFAULT_BATCH_SIZE) -> Generator[None, None, None]:
+        """Group many small transactions into one outer transaction.
 
-    def commit(self) -> None:
-        conn = self.db.conn
-        if conn is not None and conn.in_transaction:
+        Inside a batch, begin_transaction/commit/rollback act on SAVEPOINTs, so a
+        rolled-back unit never discards earlier units. The outer transaction is
+        committed every `size` units, on commit(durable=True), and on exit.
+        Nested batches join the outer one.
+        """
+        if self._batch_size is not None:
+            yield
+            return
+
+        self._batch_size = size
+        self._batch_units = 0
+        try:
+            yield
+        finally:
+            self._end_batch()
+
+    def _end_batch(self) -> None:
+        self._batch_size = None
+        self._fringe_filter = self._full_filter = None
+        self._filter_budget.clear()
+        self._settle_units()
+
+    def _settle_units(self) -> None:
+        """Discard any unit left open by an interrupted caller, commit completed units."""
+        conn = self._conn
+        if conn is None:
+            return
+        while self._savepoint_depth:
+            conn.execute("ROLLBACK TO unit")
+            conn.execute("RELEASE unit")
+            self._savepoint_depth -= 1
+        if conn.in_transaction:
             conn.execute("COMMIT")
+        self._batch_units = 0
+
+    def begin_transaction(self) -> None:
+        conn = self.conn
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        self._bulk_unit.clear()
+        if self._batch_size is not None:
+            conn.execute("SAVEPOINT unit")
+            self._savepoint_depth += 1
+
+    def commit(self, durable: bool = False) -> None:
+        """Commit the current unit of work.
+
+        Args:
+            durable: Persist immediately even inside a batch. Required when the
+                committed rows must be on disk before a filesystem mutation.
+        """
+        conn = self.conn
+        if not conn.in_transaction:
+            return
+        if self._batch_size is not None and self._savepoint_depth:
+            conn.execute("RELEASE unit")
+            self._savepoint_depth -= 1
+            if self._savepoint_depth:
+                return
+            self._batch_units += 1
+            if not durable and self._batch_units < self._batch_size:
+                return
+        conn.execute("COMMIT")
+        self._batch_units = 0
+        if durable:
+            self._sync_wal()
+
+    def _sync_wal(self) -> None:
+        """fsync the WAL so committed frames survive power loss (as synchronous=FULL would).
+
+        synchronous cannot change inside a transaction, and a batch keeps one open,
+        so durable commits flush the WAL file directly instead. Without WAL,
+        synchronous=FULL has already synced the commit.
+        """
+        if not self._wal:
+            return
+        if self._wal_fd is None:
+            wal_path = f"{self._db_path.absolute()}-wal"
+            self._wal_fd = os.open(wal_path, os.O_RDONLY | os.O_CLOEXEC)
+        os.fsync(self._wal_fd)
 
     def rollback(self) -> None:
-        conn = self.db.conn
-        if conn is not None and conn.in_transaction:
-            conn.execute("ROLLBACK")
+        conn = self.conn
+        if not conn.in_transaction:
+            return
+        # Forget bulk-mode hashes whose rows are being rolled back
+        if self._bulk_full is not None:
+            for full_hash in self._bulk_unit:
+                self._bulk_full.pop(full_hash, None)
+        self._bulk_unit.clear()
+        if self._batch_size is not None:
+            if self._savepoint_depth:
+                conn.execute("ROLLBACK TO unit")
+                conn.execute("RELEASE unit")
+                self._savepoint_depth -= 1
+            return
+        conn.execute("ROLLBACK")
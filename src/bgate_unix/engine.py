@@ -1,19 +1,28 @@
 """Core deduplication engine with tiered short-circuit logic.
 
 Unix-only implementation using os.link/unlink for atomic moves.
-Absolute trust model: xxh128 collisions are treated as impossible.
+Absolute trust model: xxh3_128 collisions are treated as impossible.
 """
 
 from __future__ import annotations
 
 import contextlib
 import errno
+import fnmatch
+import functools
+import io
+import itertools
 import json
+import multiprocessing
 import os
+import queue
+import re
 import signal
 import stat
 import sys
-import uuid
+import threading
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import UTC, datetime
@@ -27,7 +36,10 @@ from loguru import logger
 from bgate_unix.db import DedupeDatabase
 
 if TYPE_CHECKING:
-    from collections.abc import Generator, Iterator
+    from collections.abc import Callable, Generator, Iterator
+    from types import FrameType
+
+    _SignalHandler = Callable[[int, FrameType | None], object] | int | None
 
 # Unix-only enforcement
 if sys.platform == "win32":
@@ -36,6 +48,12 @@ if sys.platform == "win32":
 # Constants
 FRINGE_SIZE = 64 * 1024  # 64KB for edge reads
 CHUNK_SIZE = 256 * 1024  # 256KB chunks for all storage types
+READAHEAD_SIZE = 16 * 1024 * 1024  # Prefetch window requested before a full-file read
+DROP_CACHE_SIZE = 16 * 1024 * 1024  # Files this large leave the page cache once hashed
+WALK_QUEUE_SIZE = 64  # Directory listings buffered ahead of the consumer
+HASH_BATCH_SIZE = 256  # Files hashed ahead of the sequential tier logic
+RANDOM_POOL_SIZE = 4096  # Random bytes fetched per refill for processing-dir names
+DIR_FD_CACHE_SIZE = 64  # Directory fds kept open for repeated fsyncs during a scan
 DEFAULT_IGNORES = {
     ".git",
     "node_modules",
@@ -47,9 +65,24 @@ DEFAULT_IGNORES = {
     ".idea",
     ".vscode",
 }
+# Reused per file; json.dumps builds a new encoder whenever it gets options.
+# Metadata keeps json.dumps' default separators so stored rows stay byte-identical.
+_METADATA_ENCODER = json.JSONEncoder(check_circular=False)
+_RECORD_ENCODER = json.JSONEncoder(separators=(",", ":"), check_circular=False)
+
+_GLOB_CHARS = frozenset("*?[")
+
+# Hasher constructors bound once instead of looked up on the module per file
+_xxh3_64_digest = xxhash.xxh3_64_digest
+_xxh3_128 = xxhash.xxh3_128
+_xxh3_128_digest = xxhash.xxh3_128_digest
 
 # Signal handling for critical sections
-_deferred_signal: tuple[int, object] | None = None
+_GUARDED_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+_deferred_signal: tuple[int, FrameType | None] | None = None
+_critical_depth = 0
+# Handlers replaced by _deferred_signal_handler while a signal_guard() is active
+_saved_handlers: dict[int, _SignalHandler] | None = None
 
 
 class DedupeResult(Enum):
@@ -74,10 +107,89 @@ class ProcessResult:
     error: str | None = None
 
 
-def _deferred_signal_handler(signum: int, frame: object) -> None:
-    """Store signal for later delivery after critical section completes."""
+@dataclass(frozen=True, slots=True)
+class _IgnoreRules:
+    """Entry names to skip: exact names in a set, glob patterns in one compiled regex."""
+
+    names: frozenset[str]
+    globs: re.Pattern[str] | None = None
+    # Patterns written with a trailing slash ("build/"), which only skip directories
+    dirs: _IgnoreRules | None = None
+
+    @classmethod
+    @functools.lru_cache(maxsize=16)
+    def compile(cls, patterns: frozenset[str]) -> _IgnoreRules:
+        """Rules for `patterns`, cached: repeated walks with the same set share one regex."""
+        dir_patterns = {p for p in patterns if p.endswith("/") and p.rstrip("/")}
+        rest = patterns - dir_patterns
+        names = frozenset(p for p in rest if _GLOB_CHARS.isdisjoint(p))
+        globs = [fnmatch.translate(p) for p in sorted(rest - names)]
+        dirs = cls.compile(frozenset(p.rstrip("/") for p in dir_patterns)) if dir_patterns else None
+        return cls(names, re.compile("|".join(globs)) if globs else None, dirs)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.names or (self.globs is not None and self.globs.match(name) is not None)
+
+    def skips_dir(self, name: str) -> bool:
+        """Whether a directory passing `in` is still skipped by a directory-only pattern."""
+        return self.dirs is not None and name in self.dirs
+
+
+def _deferred_signal_handler(signum: int, frame: FrameType | None) -> None:
+    """Store signal for later delivery if a critical section is running, else pass it on."""
     global _deferred_signal
-    _deferred_signal = (signum, frame)
+    if _critical_depth:
+        _deferred_signal = (signum, frame)
+    elif _saved_handlers is not None:
+        _deliver_signal(signum, frame, _saved_handlers[signum])
+
+
+def _deliver_signal(signum: int, frame: FrameType | None, handler: _SignalHandler) -> None:
+    """Hand a signal to the handler that was installed before ours."""
+    if handler == signal.SIG_IGN:
+        return
+    if callable(handler):
+        handler(signum, frame)
+        return
+    # Default behavior - restore it and re-raise
+    signal.signal(signum, signal.SIG_DFL)
+    signal.raise_signal(signum)
+
+
+@contextmanager
+def signal_guard() -> Generator[None, None, None]:
+    """Install the deferring SIGINT/SIGTERM handlers once for a run of critical sections.
+
+    Nested critical_section() calls then only flip a counter instead of swapping
+    handlers (two sigaction() calls each way) on every atomic_move. Outside a
+    critical section, signals go straight to the previous handlers. A no-op off the
+    main thread, where handlers cannot be installed.
+    """
+    global _saved_handlers, _deferred_signal
+    if _saved_handlers is not None or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    handlers: dict[int, _SignalHandler] = {
+        signum: signal.signal(signum, _deferred_signal_handler) for signum in _GUARDED_SIGNALS
+    }
+    _saved_handlers = handlers
+    try:
+        yield
+    finally:
+        # Finalized off the main thread (e.g. an abandoned generator collected
+        # elsewhere): handlers cannot be swapped there. Ours stay installed and keep
+        # passing signals through to the saved ones.
+        if threading.current_thread() is threading.main_thread():
+            # Restore before clearing, so a signal arriving meanwhile still reaches
+            # a handler that knows where to send it
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+            _saved_handlers = None
+            if _deferred_signal is not None and not _critical_depth:
+                signum, frame = _deferred_signal
+                _deferred_signal = None
+                _deliver_signal(signum, frame, handlers[signum])
 
 
 @contextmanager
@@ -86,30 +198,32 @@ def critical_section() -> Generator[None, None, None]:
 
     Ensures atomic_move operations complete fully before honoring interrupts.
     """
-    global _deferred_signal
-    _deferred_signal = None
-
-    old_sigint = signal.signal(signal.SIGINT, _deferred_signal_handler)
-    old_sigterm = signal.signal(signal.SIGTERM, _deferred_signal_handler)
+    global _critical_depth, _deferred_signal
+    pending: tuple[int, FrameType | None, _SignalHandler] | None = None
 
     try:
-        yield
+        with signal_guard():
+            _critical_depth += 1
+            try:
+                yield
+            finally:
+                _critical_depth -= 1
+                if not _critical_depth and _deferred_signal is not None:
+                    signum, frame = _deferred_signal
+                    _deferred_signal = None
+                    if _saved_handlers is not None:
+                        pending = (signum, frame, _saved_handlers[signum])
     finally:
-        signal.signal(signal.SIGINT, old_sigint)
-        signal.signal(signal.SIGTERM, old_sigterm)
-
-        if _deferred_signal is not None:
-            signum, frame = _deferred_signal
-            _deferred_signal = None
-            logger.warning("Deferred signal {} received, re-raising after critical section", signum)
-            # Re-raise the signal to the original handler
-            if signum == signal.SIGINT and old_sigint not in (signal.SIG_IGN, signal.SIG_DFL):
-                old_sigint(signum, frame)  # type: ignore[operator]
-            elif signum == signal.SIGTERM and old_sigterm not in (signal.SIG_IGN, signal.SIG_DFL):
-                old_sigterm(signum, frame)  # type: ignore[operator]
-            else:
-                # Default behavior - re-raise
-                signal.raise_signal(signum)
+        # Delivered once the guard (if ours) has restored the previous handlers
+        if pending is not None:
+            logger.warning(
+                "Deferred signal {} received, re-raising after critical section", pending[0]
+            )
+            _deliver_signal(*pending)
+
+
+# Open directory fds by path while a dir_fd_cache() is active
+_dir_fds: dict[Path, int] | None = None
 
 
 def _fsync_dir(dir_path: Path) -> None:
@@ -117,15 +231,57 @@ def _fsync_dir(dir_path: Path) -> None:
 
     Critical for power-loss safety: without this, directory entry changes
     (file moves) may not survive a crash even if the file data is written.
+    Inside dir_fd_cache(), the directory fd is kept open for the next sync.
+    """
+    cache = _dir_fds
+    if cache is None:
+        fd = os.open(dir_path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        return
+
+    fd = cache.pop(dir_path, None)
+    if fd is None:
+        fd = os.open(dir_path, os.O_RDONLY | os.O_DIRECTORY)
+        if len(cache) >= DIR_FD_CACHE_SIZE:
+            os.close(cache.pop(next(iter(cache))))
+    # Re-inserted last: the dict's order doubles as least-recently-used order
+    cache[dir_path] = fd
+    os.fsync(fd)
+
+
+def _forget_dir_fd(dir_path: Path) -> None:
+    """Drop a cached fd for a directory that was just (re)created; it may be stale."""
+    if _dir_fds is not None and (fd := _dir_fds.pop(dir_path, None)) is not None:
+        os.close(fd)
+
+
+@contextmanager
+def dir_fd_cache() -> Generator[None, None, None]:
+    """Keep up to DIR_FD_CACHE_SIZE directory fds open across _fsync_dir() calls.
+
+    Every move syncs its shard directory, so a scan keeps the fds of its busiest
+    directories instead of paying an open() and close() per sync. Directories this process
+    recreates are evicted first; one removed and recreated by someone else
+    mid-scan would be synced through its stale fd.
     """
-    fd = os.open(dir_path, os.O_RDONLY | os.O_DIRECTORY)
+    global _dir_fds
+    if _dir_fds is not None:
+        yield
+        return
+
+    _dir_fds = {}
     try:
-        os.fsync(fd)
+        yield
     finally:
-        os.close(fd)
+        fds, _dir_fds = _dir_fds, None
+        for fd in fds.values():
+            os.close(fd)
 
 
-def atomic_move(src: Path, dest: Path) -> None:
+def atomic_move(src: Path, dest: Path, deferred_syncs: set[Path] | None = None) -> None:
     """Atomically move file with full directory durability.
 
     Uses critical_section to defer signals until the move completes.
@@ -135,6 +291,10 @@ def atomic_move(src: Path, dest: Path) -> None:
     Args:
         src: Source file path.
         dest: Destination file path.
+        deferred_syncs: If given, the source directory is added here instead of
+            synced; the caller must fsync it later. The new link is still durable
+            before the unlink, so a crash in between can only resurrect the source
+            name (a second link to the moved file), never lose the file.
 
     Raises:
         FileExistsError: If destination already exists.
@@ -157,6 +317,8 @@ def atomic_move(src: Path, dest: Path) -> None:
         # 2. Create directories (inside critical section to prevent partial state on SIGINT)
         if dirs_to_sync_parents_of:
             parent.mkdir(parents=True, exist_ok=True)
+            for d in dirs_to_sync_parents_of:
+                _forget_dir_fd(d)
 
         try:
             os.link(src, dest)
@@ -181,7 +343,46 @@ def atomic_move(src: Path, dest: Path) -> None:
         src.unlink()
 
         # 6. Sync source directory to ensure unlink is durable
-        _fsync_dir(src.parent)
+        if deferred_syncs is not None:
+            deferred_syncs.add(src.parent)
+        else:
+            _fsync_dir(src.parent)
+
+
+_O_NOATIME = getattr(os, "O_NOATIME", 0)
+
+
+def _open_for_hashing(file_path: Path) -> io.FileIO:
+    """Open a file unbuffered and read-only without updating its atime.
+
+    Scans then leave no dirty inodes behind. Callers read in explicit chunks, so
+    no Python-level buffer is needed.
+
+    O_NOATIME is only allowed on files we own (or with CAP_FOWNER); on EPERM the
+    file is reopened normally.
+    """
+    try:
+        fd = os.open(file_path, os.O_RDONLY | os.O_CLOEXEC | _O_NOATIME)
+    except PermissionError as e:
+        if e.errno != errno.EPERM or not _O_NOATIME:
+            raise
+        fd = os.open(file_path, os.O_RDONLY | os.O_CLOEXEC)
+    return io.FileIO(fd, "rb")
+
+
+def _read_exact(f: io.FileIO, view: memoryview) -> int:
+    """readinto() until `view` is full or EOF; returns the bytes read.
+
+    A single unbuffered read may legally come back short (NFS, FUSE, signals), so
+    a short count from one call does not mean EOF.
+    """
+    total = 0
+    while total < len(view):
+        n = f.readinto(view[total:])
+        if not n:
+            break
+        total += n
+    return total
 
 
 def _compute_fringe_hash(file_path: Path, _file_size: int = 0) -> bytes:
@@ -196,55 +397,289 @@ def _compute_fringe_hash(file_path: Path, _file_size: int = 0) -> bytes:
         _file_size: Deprecated, kept for API compatibility. Actual size from FD is used.
 
     Returns:
-        Raw 8-byte digest from xxh64.
+        Raw 8-byte digest from xxh3_64.
     """
-    hasher = xxhash.xxh64()
+    # Head, tail and size suffix are read into this thread's buffer back to back and
+    # hashed in one call; same digest as streaming them through xxh3_64
+    view = _read_buffer()
 
     try:
-        with file_path.open("rb") as f:
+        with _open_for_hashing(file_path) as f:
             # Get authoritative size from file descriptor to avoid TOCTOU
             actual_size = f.seek(0, os.SEEK_END)
             f.seek(0)
+            if actual_size > 2 * FRINGE_SIZE:
+                # Only the two windows are wanted: no readahead into the middle
+                _advise(f.fileno(), "POSIX_FADV_RANDOM")
 
-            first_chunk = f.read(FRINGE_SIZE)
-            hasher.update(first_chunk)
+            used = _read_exact(f, view[:FRINGE_SIZE])
 
             if actual_size > FRINGE_SIZE:
                 # Overlap allowed spec: always read last 64KB (even if overlapping)
                 seek_pos = max(0, actual_size - FRINGE_SIZE)
                 f.seek(seek_pos)
-                last_chunk = f.read(FRINGE_SIZE)
-                hasher.update(last_chunk)
+                used += _read_exact(f, view[used : used + FRINGE_SIZE])
 
             # Use actual size from FD, not the passed estimate
-            hasher.update(actual_size.to_bytes(8, "little"))
+            view[used : used + 8] = actual_size.to_bytes(8, "little")
+            return _xxh3_64_digest(view[: used + 8])
     except OSError as e:
         raise OSError(f"Failed to read file for fringe hash: {file_path}") from e
 
-    return hasher.digest()
+
+def _advise(fd: int, advice: str, offset: int = 0, length: int = 0) -> None:
+    """posix_fadvise() by constant name where the platform has it; failures are ignored."""
+    value = getattr(os, advice, None)
+    if value is None:
+        return
+    with contextlib.suppress(OSError):
+        os.posix_fadvise(fd, offset, length, value)
+
+
+def _advise_sequential(fd: int) -> None:
+    """Hint the kernel that the whole file will be read front to back.
+
+    Doubles the readahead window and starts fetching the head of the file so the
+    disk queue stays busy while hashing. Advisory only: failures are ignored.
+    """
+    _advise(fd, "POSIX_FADV_SEQUENTIAL")
+    _advise(fd, "POSIX_FADV_WILLNEED", 0, READAHEAD_SIZE)
+
+
+_buffers = threading.local()
+
+
+def _read_buffer() -> memoryview:
+    """This thread's CHUNK_SIZE read buffer, allocated once instead of per file."""
+    view = getattr(_buffers, "view", None)
+    if view is None:
+        view = _buffers.view = memoryview(bytearray(CHUNK_SIZE))
+    return view
+
+
+_random = threading.local()
+
+
+def _take_random(n: int) -> bytes:
+    """n random bytes from this thread's RANDOM_POOL_SIZE pool, one getrandom() per refill."""
+    pool: bytes = getattr(_random, "pool", b"")
+    pos: int = getattr(_random, "pos", 0)
+    if pos + n > len(pool):
+        pool = _random.pool = os.urandom(max(RANDOM_POOL_SIZE, n))
+        pos = 0
+    _random.pos = pos + n
+    return pool[pos : pos + n]
+
+
+# A forked child must not hand out the same names as its parent
+os.register_at_fork(after_in_child=lambda: _random.__dict__.clear())
 
 
 def _compute_full_hash(file_path: Path) -> bytes:
-    """Compute full content hash using xxHash128.
+    """Compute full content hash using XXH3-128 (SIMD-dispatched in libxxhash).
 
     Args:
         file_path: Path to file.
 
     Returns:
-        Raw 16-byte digest from xxh128.
+        Raw 16-byte digest from xxh3_128.
     """
-    hasher = xxhash.xxh128()
+    # Reused buffer instead of a fresh bytes object per chunk
+    view = _read_buffer()
 
     try:
-        with file_path.open("rb") as f:
-            while chunk := f.read(CHUNK_SIZE):
-                hasher.update(chunk)
+        with _open_for_hashing(file_path) as f:
+            n = _read_exact(f, view)
+            if n < len(view):
+                # Reached EOF within the first buffer: the whole file, in one C call.
+                # A single short read is not EOF, hence _read_exact.
+                return _xxh3_128_digest(view[:n])
+            _advise_sequential(f.fileno())
+            hasher = _xxh3_128(view)
+            size = n
+            while n := f.readinto(view):
+                hasher.update(view[:n])
+                size += n
+            if size >= DROP_CACHE_SIZE:
+                # Never read again by us; keep the cache for the index and metadata
+                _advise(f.fileno(), "POSIX_FADV_DONTNEED")
     except OSError as e:
         raise OSError(f"Failed to read file for full hash: {file_path}") from e
 
     return hasher.digest()
 
 
+def _compute_both_hashes(file_path: Path) -> tuple[bytes, bytes]:
+    """Compute the fringe and full hash in one sequential read.
+
+    Same digests as _compute_fringe_hash and _compute_full_hash, but the fringe
+    windows are cut from the chunks already streamed into the full hash, so no
+    byte is read twice.
+
+    Returns:
+        (8-byte xxh3_64 fringe digest, 16-byte xxh3_128 full digest).
+    """
+    full_hasher = _xxh3_128()
+    view = _read_buffer()
+    head = bytearray()
+    tail = bytearray()
+
+    try:
+        with _open_for_hashing(file_path) as f:
+            size = os.fstat(f.fileno()).st_size
+            _advise_sequential(f.fileno())
+            # Files within one window have no separate tail
+            tail_start = size - FRINGE_SIZE if size > FRINGE_SIZE else size
+            offset = 0
+            while n := f.readinto(view):
+                chunk = view[:n]
+                full_hasher.update(chunk)
+                if offset < FRINGE_SIZE:
+                    head += chunk[: FRINGE_SIZE - offset]
+                if offset + n > tail_start:
+                    tail += chunk[max(0, tail_start - offset) :]
+                offset += n
+            if offset >= DROP_CACHE_SIZE:
+                _advise(f.fileno(), "POSIX_FADV_DONTNEED")
+    except OSError as e:
+        raise OSError(f"Failed to read file for hashing: {file_path}") from e
+
+    if offset != size:
+        # Changed while being read: take the fringe the way Tier 2 would
+        return _compute_fringe_hash(file_path), full_hasher.digest()
+
+    head += tail
+    head += size.to_bytes(8, "little")
+    return _xxh3_64_digest(head), full_hasher.digest()
+
+
+def _inode_key(st: os.stat_result) -> tuple[int, int]:
+    return st.st_dev, st.st_ino
+
+
+def _same_file(a: Path, b: Path) -> bool:
+    """Whether both paths name the same inode; False if either is gone."""
+    try:
+        return a.samefile(b)
+    except OSError:
+        return False
+
+
+def _same_path(a: Path, b: Path) -> bool:
+    """Whether a and b are one path spelled differently.
+
+    A hard link elsewhere shares the inode but is a different path, so it still
+    counts as a duplicate. The inode compare is two stats; resolve(), which
+    lstat()s every component, only runs when the inodes already match.
+    """
+    return a == b or (_same_file(a, b) and a.resolve() == b.resolve())
+
+
+def _compute_hashes(path: str) -> tuple[bytes, bytes] | None:
+    """Hash pool worker: fringe and full hash of one file, or None if unreadable.
+
+    Unreadable files are left to the sequential path, which reports them as SKIPPED.
+    """
+    try:
+        return _compute_both_hashes(Path(path))
+    except OSError:
+        return None
+
+
+@contextmanager
+def _scandir_at(directory: Path | str) -> Generator[tuple[str, Iterator[os.DirEntry[str]]]]:
+    """scandir() through a directory fd, yielding (path prefix, entries).
+
+    Entry stats then become fstatat() on the name instead of an lstat() that
+    resolves every component of the full path again; callers build entry paths
+    as prefix + entry.name.
+    """
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY | os.O_CLOEXEC)
+    try:
+        with os.scandir(fd) as entries:
+            yield os.fspath(directory).rstrip(os.sep) + os.sep, entries
+    finally:
+        os.close(fd)
+
+
+def _scan_dir(
+    directory: str, ignores: _IgnoreRules
+) -> tuple[list[tuple[str, os.stat_result]], list[str]]:
+    """List one directory: regular files with their lstat results, plus subdirectories."""
+    files: list[tuple[str, os.stat_result]] = []
+    subdirs: list[str] = []
+    try:
+        with _scandir_at(directory) as (prefix, entries):
+            for entry in entries:
+                if entry.name in ignores:
+                    continue
+                path = prefix + entry.name
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        files.append((path, entry.stat(follow_symlinks=False)))
+                    elif entry.is_dir(follow_symlinks=False) and not ignores.skips_dir(entry.name):
+                        subdirs.append(path)
+                except OSError as e:
+                    logger.warning("Error accessing {}: {}", path, e)
+    except OSError as e:
+        logger.warning("Error scanning directory {}: {}", directory, e)
+    return files, subdirs
+
+
+def _walk_parallel(
+    directory: Path, ignores: _IgnoreRules, workers: int
+) -> Iterator[tuple[str, os.stat_result]]:
+    """Walk a directory tree with a pool of scandir workers.
+
+    Each worker lists one directory and submits its subdirectories back to the
+    pool. File listings flow through a bounded queue, so the walk never runs far
+    ahead of the consumer. Yield order follows completion, not tree order.
+    """
+    # None marks the end of the walk
+    listings: queue.Queue[list[tuple[str, os.stat_result]] | None] = queue.Queue(
+        maxsize=WALK_QUEUE_SIZE
+    )
+    stop = threading.Event()
+    lock = threading.Lock()
+    outstanding = 1
+
+    def put(item: list[tuple[str, os.stat_result]] | None) -> None:
+        # Bounded put that gives up once the consumer has gone away
+        while not stop.is_set():
+            try:
+                listings.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bgate-walk") as pool:
+
+        def visit(path: str) -> None:
+            nonlocal outstanding
+            try:
+                if not stop.is_set():
+                    files, subdirs = _scan_dir(path, ignores)
+                    with lock:
+                        outstanding += len(subdirs)
+                    for subdir in subdirs:
+                        pool.submit(visit, subdir)
+                    if files:
+                        put(files)
+            finally:
+                with lock:
+                    outstanding -= 1
+                    finished = outstanding == 0
+                if finished:
+                    put(None)
+
+        pool.submit(visit, str(directory))
+        try:
+            while (item := listings.get()) is not None:
+                yield from item
+        finally:
+            stop.set()
+
+
 class FileDeduplicator:
     """High-performance file deduplicator with tiered short-circuit logic.
 
@@ -252,7 +687,7 @@ class FileDeduplicator:
     - Tier 0: Skip empty files (size == 0)
     - Tier 1: Size-based lookup (unique size = unique file)
     - Tier 2: Fringe hash (first 64KB + last 64KB + size)
-    - Tier 3: Full content hash (xxHash128) - absolute identity
+    - Tier 3: Full content hash (XXH3-128) - absolute identity
 
     Args:
         db_path: Path to SQLite database file.
@@ -267,12 +702,20 @@ class FileDeduplicator:
         self._db = DedupeDatabase(db_path)
         self._processing_dir = Path(processing_dir) if processing_dir else None
         self._connected = False
+        # Source directories whose unlinks still need an fsync (set during process_directory)
+        self._deferred_syncs: set[Path] | None = None
+        # Shard directories known to exist, so the per-file mkdir() is skipped after warmup
+        self._known_shards: set[str] = set()
 
     def connect(self) -> None:
         """Connect to database and run recovery."""
         self._db.connect()
         self._connected = True
 
+        if self._db.fringe_rebuild_required:
+            self._rebuild_fringe_index()
+
+        self._known_shards = self._existing_shards()
         self._check_emergency_orphans()
 
         recovery_count = self._recover_from_journal()
@@ -299,41 +742,55 @@ class FileDeduplicator:
         self.close()
         return None
 
+    def _rebuild_fringe_index(self) -> None:
+        """Recompute fringe hashes for every indexed file.
+
+        Needed after a fringe hash algorithm change (schema v5). Files that no longer
+        exist are left out; a later duplicate of them still resolves via Tier 3.
+        """
+        rows: list[tuple[bytes, int]] = []
+        for stored_path in list(self._db.get_all_paths()):
+            path = Path(stored_path)
+            try:
+                file_size = path.stat().st_size
+                fringe_hash = _compute_fringe_hash(path, file_size)
+            except OSError:
+                logger.warning("Cannot rebuild fringe entry for missing file: {}", path)
+                continue
+            rows.append((fringe_hash, file_size))
+
+        self._db.begin_transaction()
+        try:
+            rebuilt = self._db.add_fringes(rows)
+            self._db.commit()
+        except Exception:
+            self._db.rollback()
+            raise
+        logger.info("Rebuilt {} fringe index entries", rebuilt)
+
     def _ensure_connected(self) -> None:
         if not self._connected:
             raise RuntimeError("Deduplicator not connected. Use connect() or context manager.")
 
-    def _validate_path(self, path: Path) -> tuple[bool, str | None]:
-        """Validate path for security and accessibility.
+    def _validate_stat(self, path: Path, st: os.stat_result) -> tuple[bool, str | None]:
+        """Validate path for security and accessibility from its lstat() result.
 
         Symlinks are explicitly not supported:
         - process_directory() filters them out via is_file(follow_symlinks=False)
         - Direct process_file() calls are rejected here
 
-        This prevents symlink-based attacks and ensures consistent behavior.
+        Requiring S_ISREG also rejects devices, FIFOs and sockets.
         """
-        try:
-            path_str = str(path)
-            if not path_str or "\x00" in path_str:
-                return False, "Invalid file path"
-
-            # Reject symlinks - they're skipped by directory scanner anyway
-            if path.is_symlink():
-                return False, "Symlinks not supported"
-
-            if not path.is_file():
-                return False, "Not a regular file"
-
-            if not os.access(path, os.R_OK):
-                return False, "File not readable"
-
-            mode = path.stat().st_mode
-            if stat.S_ISCHR(mode) or stat.S_ISBLK(mode):
-                return False, "Device file not allowed"
-
-            return True, None
-        except OSError as e:
-            return False, str(e)
+        path_str = str(path)
+        if not path_str or "\x00" in path_str:
+            return False, "Invalid file path"
+        if stat.S_ISLNK(st.st_mode):
+            return False, "Symlinks not supported"
+        if not stat.S_ISREG(st.st_mode):
+            return False, "Not a regular file"
+        if not os.access(path, os.R_OK):
+            return False, "File not readable"
+        return True, None
 
     def process_file(
         self,
@@ -341,21 +798,45 @@ class FileDeduplicator:
         stat_result: os.stat_result | None = None,
         tags: dict[str, str] | None = None,
     ) -> ProcessResult:
-        """Process a single file through the deduplication tiers."""
+        """Process a single file through the deduplication tiers.
+
+        Args:
+            file_path: File to process.
+            stat_result: lstat() result for file_path, e.g. DirEntry.stat(follow_symlinks=False).
+                When omitted, the path is lstat'ed once and that result is reused.
+            tags: Metadata stored with the file if it is unique.
+        """
         self._ensure_connected()
+        return self._process_path(file_path, stat_result, tags)
+
+    def _process_path(
+        self,
+        file_path: Path | str,
+        stat_result: os.stat_result | None = None,
+        tags: dict[str, str] | None = None,
+        hashes: tuple[bytes, bytes] | None = None,
+    ) -> ProcessResult:
+        """Validate a path and run it through the tiers, reporting failures as SKIPPED.
+
+        Args:
+            hashes: Precomputed (fringe_hash, full_hash) from a hashing pool, if any.
+        """
         file_path = Path(file_path)
 
         try:
-            if not file_path.exists():
-                return ProcessResult(
-                    path=file_path,
-                    original_path=file_path,
-                    result=DedupeResult.SKIPPED,
-                    tier=0,
-                    error="File does not exist",
-                )
-
-            valid, error = self._validate_path(file_path)
+            if stat_result is None:
+                # One lstat() serves validation and sizing; the walker passes its own
+                try:
+                    stat_result = os.lstat(file_path)
+                except (FileNotFoundError, NotADirectoryError, ValueError):
+                    return ProcessResult(
+                        path=file_path,
+                        original_path=file_path,
+                        result=DedupeResult.SKIPPED,
+                        tier=0,
+                        error="File does not exist",
+                    )
+            valid, error = self._validate_stat(file_path, stat_result)
             if not valid:
                 logger.warning("Path validation failed for {}: {}", file_path, error)
                 return ProcessResult(
@@ -366,8 +847,8 @@ class FileDeduplicator:
                     error=f"Validation failed: {error}",
                 )
 
-            file_size = stat_result.st_size if stat_result else file_path.stat().st_size
-            return self._process_file(file_path, file_size, tags)
+            file_size = stat_result.st_size
+            return self._process_file(file_path, file_size, tags, hashes)
 
         except OSError as e:
             logger.exception("OS error processing file: {}", file_path)
@@ -389,7 +870,11 @@ class FileDeduplicator:
             )
 
     def _process_file(
-        self, file_path: Path, file_size: int, tags: dict[str, str] | None = None
+        self,
+        file_path: Path,
+        file_size: int,
+        tags: dict[str, str] | None = None,
+        hashes: tuple[bytes, bytes] | None = None,
     ) -> ProcessResult:
         """Core processing logic."""
         # Tier 0: Skip empty files
@@ -402,19 +887,39 @@ class FileDeduplicator:
                 tags=tags,
             )
 
-        # Tier 1: Size uniqueness
-        if not self._db.size_exists(file_size):
+        # Tier 1: Size uniqueness - registered without reading the file
+        size_entry = self._db.size_lookup(file_size)
+        if size_entry is None:
+            if hashes is not None:
+                return self._register_unique(file_path, file_size, *hashes, tier=1, tags=tags)
             return self._register_unique(file_path, file_size, tier=1, tags=tags)
 
+        # Second file of this size: hash the first one so Tiers 2/3 can see it
+        pending_path, pending_metadata = size_entry
+        if pending_path is not None:
+            self._promote_pending(file_size, pending_path, pending_metadata)
+
+        # Up to two fringe windows the fringe read already covers the whole file,
+        # so take the full hash from that same read rather than a second one later
+        if hashes is None and file_size <= 2 * FRINGE_SIZE:
+            hashes = _compute_both_hashes(file_path)
+
         # Tier 2: Fringe hash
-        fringe_hash = _compute_fringe_hash(file_path, file_size)
-        existing_fringe = self._db.fringe_lookup(fringe_hash, file_size)
+        if hashes is not None:
+            fringe_hash, full_hash = hashes
+        else:
+            fringe_hash = _compute_fringe_hash(file_path, file_size)
+            full_hash = None
+        fringe_seen = self._db.fringe_exists(fringe_hash, file_size)
 
-        if existing_fringe is None:
-            return self._register_unique(file_path, file_size, fringe_hash, tier=2, tags=tags)
+        if not fringe_seen:
+            return self._register_unique(
+                file_path, file_size, fringe_hash, full_hash, tier=2, tags=tags
+            )
 
         # Tier 3: Full hash - absolute identity
-        full_hash = _compute_full_hash(file_path)
+        if full_hash is None:
+            full_hash = _compute_full_hash(file_path)
         existing_full = self._db.full_lookup(full_hash)
 
         if existing_full is None:
@@ -424,7 +929,7 @@ class FileDeduplicator:
 
         # Self-check: Prevent "duplicate of self" reports
         existing_path = Path(existing_full)
-        if existing_path.resolve() == file_path.resolve():
+        if _same_path(existing_path, file_path):
             return ProcessResult(
                 path=file_path,
                 original_path=file_path,
@@ -445,6 +950,30 @@ class FileDeduplicator:
             tags=tags,
         )
 
+    def _promote_pending(self, file_size: int, pending_path: str, metadata: str | None) -> None:
+        """Hash and index the file registered at Tier 1 for this size.
+
+        A pending file that can no longer be read is dropped from the index; the
+        size stays known, so later files of that size still go through Tier 2.
+        """
+        path = Path(pending_path)
+        try:
+            fringe_hash, full_hash = _compute_both_hashes(path)
+        except OSError:
+            logger.warning("Dropping unreadable pending entry: {}", path)
+            fringe_hash = full_hash = None
+
+        self._db.begin_transaction()
+        try:
+            if fringe_hash is not None and full_hash is not None:
+                self._db.add_fringe(fringe_hash, file_size)
+                self._db.add_full(full_hash, pending_path, metadata)
+            self._db.clear_pending_size(file_size)
+            self._db.commit()
+        except Exception:
+            self._db.rollback()
+            raise
+
     def _register_unique(
         self,
         file_path: Path,
@@ -467,31 +996,31 @@ class FileDeduplicator:
         max_retries = 5
 
         if self._processing_dir:
+            # Per-file invariants, computed once rather than per retry
+            source = str(file_path)
+            suffix = file_path.suffix
+
             # Phase 1: Journal the intent
             for attempt in range(max_retries):
                 # v0.3.0 Sharding: 2-level hex (e.g. processing/aa/bbcc...)
-                if full_hash is not None:
-                    hex_val = full_hash.hex()
-                    shard = hex_val[:2]
-                    unique_name = f"{hex_val[2:16]}{file_path.suffix}"
-                else:
-                    hex_val = uuid.uuid4().hex
-                    shard = hex_val[:2]
-                    unique_name = f"{hex_val[2:16]}{file_path.suffix}"
-
+                # Hex only the 8 bytes used: 1 for the shard, 7 for the name
+                key = full_hash if full_hash is not None else _take_random(8)
+                shard = key[:1].hex()
                 if attempt > 0:
-                    unique_name = (
-                        f"{Path(unique_name).stem}_{uuid.uuid4().hex[:8]}{file_path.suffix}"
-                    )
+                    unique_name = f"{key[1:8].hex()}_{_take_random(4).hex()}{suffix}"
+                else:
+                    unique_name = f"{key[1:8].hex()}{suffix}"
 
                 dest_dir = self._processing_dir / shard
                 dest_path = dest_dir / unique_name
+                storage_path = str(dest_path)
 
                 self._db.begin_transaction()
                 try:
-                    journal_id = self._db.journal_move(str(file_path), str(dest_path), file_size)
+                    journal_id = self._db.journal_move(source, storage_path, file_size)
                     self._db.update_move_phase(journal_id, "moving")
-                    self._db.commit()
+                    # Intent must be on disk before the file moves
+                    self._db.commit(durable=True)
                 except Exception:
                     self._db.rollback()
                     raise
@@ -501,21 +1030,24 @@ class FileDeduplicator:
                     # Durable shard creation: atomic_move will create parents, but we want to ensure
                     # the shard directory entry itself is durable in the processing_dir.
                     # Performance: Only fsync processing_dir if we ACTUALLY created a new shard dir.
-                    try:
-                        dest_dir.mkdir(exist_ok=False)
-                        # New directory created - must sync parent to ensure entry is durable
-                        _fsync_dir(self._processing_dir)
-                    except FileExistsError:
-                        # Directory already exists - no parent sync needed
-                        pass
-                    except OSError as e:
-                        # CRITICAL: If mkdir fails unexpectedly (e.g. permission), we must NOT
-                        # fall back to atomic_move because we haven't synced the parent directory.
-                        # We must "fail fast" to ensure durability guarantees.
-                        logger.error("Shard pre-create failed for {}: {}", dest_dir, e)
-                        raise
-
-                    atomic_move(file_path, dest_path)
+                    if shard not in self._known_shards:
+                        try:
+                            dest_dir.mkdir(exist_ok=False)
+                            _forget_dir_fd(dest_dir)
+                            # New directory created - must sync parent to ensure entry is durable
+                            _fsync_dir(self._processing_dir)
+                        except FileExistsError:
+                            # Directory already exists - no parent sync needed
+                            pass
+                        except OSError as e:
+                            # CRITICAL: If mkdir fails unexpectedly (e.g. permission), we must NOT
+                            # fall back to atomic_move because we haven't synced the parent
+                            # directory. We must "fail fast" to ensure durability guarantees.
+                            logger.error("Shard pre-create failed for {}: {}", dest_dir, e)
+                            raise
+                        self._known_shards.add(shard)
+
+                    atomic_move(file_path, dest_path, self._deferred_syncs)
                     break
                 except FileExistsError:
                     self._db.begin_transaction()
@@ -536,7 +1068,6 @@ class FileDeduplicator:
                         self._db.rollback()
                     raise
 
-            storage_path = str(dest_path)
         else:
             storage_path = str(file_path)
 
@@ -549,18 +1080,34 @@ class FileDeduplicator:
                 if journal_id is not None:
                     self._db.update_move_phase(journal_id, "completed")
 
-                # 3b. Calculate hashes if missing (idempotent)
+                metadata_json = _METADATA_ENCODER.encode(tags) if tags else None
+
+                # 3b. Tier 1 without hashes: record as pending, hash on the next same-size file
+                if tier == 1 and fringe_hash is None and full_hash is None:
+                    self._db.add_size(file_size, storage_path, metadata_json)
+                    self._db.commit()
+                    return ProcessResult(
+                        path=dest_path if dest_path else file_path,
+                        original_path=file_path,
+                        result=DedupeResult.UNIQUE,
+                        tier=tier,
+                        stored_path=dest_path if self._processing_dir else None,
+                        tags=tags,
+                    )
+
+                # 3c. Calculate hashes if missing (idempotent)
+                stored = dest_path if dest_path is not None else file_path
                 if fringe_hash is None:
-                    fringe_hash = _compute_fringe_hash(Path(storage_path), file_size)
+                    fringe_hash = _compute_fringe_hash(stored, file_size)
                 if full_hash is None:
-                    full_hash = _compute_full_hash(Path(storage_path))
+                    full_hash = _compute_full_hash(stored)
 
-                # 3c. Insert shared metadata
-                self._db.add_size(file_size)
-                self._db.add_fringe(fringe_hash, file_size, storage_path)
+                # 3d. Insert shared metadata (Tiers 2/3 only got here because the size is known)
+                if tier == 1:
+                    self._db.add_size(file_size)
+                self._db.add_fringe(fringe_hash, file_size)
 
-                # 3d. Insert full hash - check strict uniqueness
-                metadata_json = json.dumps(tags) if tags else None
+                # 3e. Insert full hash - check strict uniqueness
                 if self._db.add_full(full_hash, storage_path, metadata_json):
                     # Success
                     self._db.commit()
@@ -633,7 +1180,7 @@ class FileDeduplicator:
                     str(dest_path), str(file_path), file_size
                 )
                 self._db.update_move_phase(rollback_journal_id, "moving")
-                self._db.commit()
+                self._db.commit(durable=True)
             except Exception:
                 self._db.rollback()
                 rollback_journal_id = None
@@ -681,7 +1228,6 @@ class FileDeduplicator:
         Includes metadata for debugging and manual recovery.
         """
         import getpass
-        import json
         import socket
 
         emergency_file = self._db.db_path.parent / "emergency_orphans.jsonl"
@@ -700,7 +1246,7 @@ class FileDeduplicator:
             # Use unbuffered I/O with O_APPEND for atomic single-syscall writes
             fd = os.open(emergency_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
             try:
-                os.write(fd, (json.dumps(record, separators=(",", ":")) + "\n").encode())
+                os.write(fd, (_RECORD_ENCODER.encode(record) + "\n").encode())
                 os.fsync(fd)
             finally:
                 os.close(fd)
@@ -736,7 +1282,6 @@ class FileDeduplicator:
 
     def _import_emergency_orphans(self, emergency_file: Path) -> int:
         """Import emergency orphan records into the database."""
-        import json
 
         imported = 0
         remaining_lines: list[str] = []
@@ -810,88 +1355,97 @@ class FileDeduplicator:
         """
         incomplete = self._db.get_incomplete_journal_entries()
         recovered = 0
+        # Rolled-back dests usually share a few shard directories; each is synced once
+        dirs_to_sync: set[Path] = set()
+        handlers: dict[str, Callable[[dict, set[Path]], bool]] = {
+            "planned": self._recover_planned,
+            "moving": self._recover_moving,
+        }
 
-        for entry in incomplete:
-            source = Path(entry["source_path"])
-            dest = Path(entry["dest_path"])
-            phase = entry["phase"]
-            journal_id = entry["id"]
+        # One outer transaction for all phase updates: each is idempotent, so a crash
+        # mid-recovery just repeats it. Filesystem steps keep their own fsync ordering.
+        # Sized so it only commits on exit, after the deferred dest syncs below.
+        with self._db.batch(size=len(incomplete) + 1):
+            for entry in incomplete:
+                handler = handlers.get(entry["phase"])
+                if handler is not None and handler(entry, dirs_to_sync):
+                    recovered += 1
 
-            if phase == "planned":
-                # Move never started - just mark as failed
-                self._db.begin_transaction()
+            # Before the batch commits, so no entry is marked failed while its unlink
+            # could still be undone by a crash
+            for directory in dirs_to_sync:
                 try:
-                    self._db.update_move_phase(journal_id, "failed")
-                    self._db.commit()
-                except Exception:
-                    self._db.rollback()
-                recovered += 1
-            elif phase == "moving":
-                # Attempt atomic rollback without exists() checks (TOCTOU-safe)
-                try:
-                    # Try to create hard link back to source
-                    os.link(dest, source)
-                    # CRITICAL: Sync source directory BEFORE unlinking dest
-                    _fsync_dir(source.parent)
-                    dest.unlink()
-                    with contextlib.suppress(FileNotFoundError, OSError):
-                        _fsync_dir(dest.parent)
+                    _fsync_dir(directory)
+                except OSError as e:
+                    logger.warning("Failed to sync directory {}: {}", directory, e)
 
-                    self._db.begin_transaction()
-                    try:
-                        self._db.update_move_phase(journal_id, "failed")
-                        self._db.commit()
-                    except Exception:
-                        self._db.rollback()
+        return recovered
 
-                    logger.info("Rolled back incomplete move: {} -> {}", dest, source)
-                    recovered += 1
-                except FileExistsError:
-                    # Source already exists - link() never completed or was interrupted
-                    # Safe to remove dest if it exists
-                    with contextlib.suppress(FileNotFoundError):
-                        dest.unlink()
-                    # Sync dest parent if it exists
-                    with contextlib.suppress(FileNotFoundError, OSError):
-                        _fsync_dir(dest.parent)
+    def _recover_planned(self, entry: dict, _dirs_to_sync: set[Path]) -> bool:
+        """Move never started - just mark as failed (unless another recovery did)."""
+        return self._fail_journal_entry(entry["id"])
 
-                    self._db.begin_transaction()
-                    try:
-                        self._db.update_move_phase(journal_id, "failed")
-                        self._db.commit()
-                    except Exception:
-                        self._db.rollback()
+    def _recover_moving(self, entry: dict, dirs_to_sync: set[Path]) -> bool:
+        """Move the file back to its source; dest directories are left in dirs_to_sync.
 
-                    recovered += 1
-                except FileNotFoundError:
-                    # Dest doesn't exist - move never happened or manual cleanup
-                    self._db.begin_transaction()
-                    try:
-                        self._db.update_move_phase(journal_id, "failed")
-                        self._db.commit()
-                    except Exception:
-                        self._db.rollback()
+        Returns False only when the file could not be put back and the entry is left
+        for manual review.
+        """
+        source = Path(entry["source_path"])
+        dest = Path(entry["dest_path"])
+        journal_id = entry["id"]
 
-                    recovered += 1
-                except OSError as e:
-                    if e.errno == errno.EXDEV:
-                        logger.error(
-                            "Cannot rollback cross-device move: {} -> {}. "
-                            "Manual intervention required.",
-                            dest,
-                            source,
-                        )
-                    else:
-                        logger.error(
-                            "Critical: Cannot rollback move {} -> {}: {}. "
-                            "File may exist in processing_dir but is NOT indexed!",
-                            dest,
-                            source,
-                            e,
-                        )
-                    # Don't mark as failed - needs manual review
+        # Attempt atomic rollback without exists() checks (TOCTOU-safe)
+        try:
+            # Try to create hard link back to source
+            os.link(dest, source)
+            # CRITICAL: Sync source directory BEFORE unlinking dest
+            _fsync_dir(source.parent)
+            dest.unlink()
+            dirs_to_sync.add(dest.parent)
+            self._fail_journal_entry(journal_id)
+            logger.info("Rolled back incomplete move: {} -> {}", dest, source)
+        except FileExistsError:
+            # Source already exists - link() never completed or was interrupted
+            # Safe to remove dest if it exists
+            dest.unlink(missing_ok=True)
+            dirs_to_sync.add(dest.parent)
+            self._fail_journal_entry(journal_id)
+        except FileNotFoundError:
+            # Dest doesn't exist - move never happened or manual cleanup
+            self._fail_journal_entry(journal_id)
+        except OSError as e:
+            if e.errno == errno.EXDEV:
+                logger.error(
+                    "Cannot rollback cross-device move: {} -> {}. Manual intervention required.",
+                    dest,
+                    source,
+                )
+            else:
+                logger.error(
+                    "Critical: Cannot rollback move {} -> {}: {}. "
+                    "File may exist in processing_dir but is NOT indexed!",
+                    dest,
+                    source,
+                    e,
+                )
+            # Don't mark as failed - needs manual review
+            return False
+        return True
 
-        return recovered
+    def _fail_journal_entry(self, journal_id: int) -> bool:
+        """Mark an unfinished move failed in its own unit of work.
+
+        Returns False if another recovery already settled it or the update failed.
+        """
+        self._db.begin_transaction()
+        try:
+            updated = self._db.update_move_phase(journal_id, "failed")
+            self._db.commit()
+        except Exception:
+            self._db.rollback()
+            return False
+        return updated
 
     def process_directory(
         self,
@@ -899,9 +1453,26 @@ class FileDeduplicator:
         recursive: bool = True,
         ignore_patterns: list[str] | None = None,
         tags: dict[str, str] | None = None,
+        jobs: int = 1,
+        bulk: bool = False,
     ) -> Iterator[ProcessResult]:
-        """Process all files in a directory."""
+        """Process all files in a directory.
+
+        Args:
+            directory: Directory to scan.
+            recursive: Descend into subdirectories.
+            ignore_patterns: Extra names or glob patterns (e.g. "*.tmp") to skip, on top
+                of DEFAULT_IGNORES.
+            tags: Metadata stored with every unique file.
+            jobs: Workers for the recursive walk and for hashing (1 = fully serial,
+                0 = one per CPU).
+            bulk: While the full-hash index is empty, rebuild it once at the end
+                instead of per row (DedupeDatabase.bulk_mode). Locks every other
+                connection, readers included, out of the database for the scan.
+        """
         self._ensure_connected()
+        if jobs == 0:
+            jobs = os.cpu_count() or 1
         directory = Path(directory)
 
         if not directory.is_dir():
@@ -914,75 +1485,237 @@ class FileDeduplicator:
 
         # Load .bgateignore if it exists
         bgateignore_path = directory / ".bgateignore"
-        if bgateignore_path.exists():
-            try:
-                with bgateignore_path.open() as f:
-                    for line in f:
-                        line = line.strip()
-                        if line and not line.startswith("#"):
-                            ignores.add(line)
-            except Exception as e:
-                logger.warning("Failed to read .bgateignore: {}", e)
+        try:
+            lines = bgateignore_path.read_text("utf-8", errors="replace").splitlines()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("Failed to read .bgateignore: {}", e)
+        else:
+            stripped = (line.strip() for line in lines)
+            ignores.update(line for line in stripped if line and not line.startswith("#"))
+
+        ignore_rules = _IgnoreRules.compile(frozenset(ignores))
+
+        # Index writes for many files share one commit; move intents still commit durably.
+        # Bulk mode sits outside the batch so the batch is committed before the rebuild.
+        with (
+            self._db.bulk_mode() if bulk else contextlib.nullcontext(),
+            self._db.batch(),
+            self._db.background_checkpoints(),
+            dir_fd_cache(),
+            self._deferred_dir_syncs(),
+            signal_guard(),
+        ):
+            if jobs <= 1:
+                yield from self._process_directory_scandir(directory, recursive, ignore_rules, tags)
+                return
+
+            if recursive:
+                files = _walk_parallel(directory, ignore_rules, jobs)
+            else:
+                files = iter(_scan_dir(str(directory), ignore_rules)[0])
+            yield from self._process_prefetched(files, tags, jobs)
+
+    @contextmanager
+    def _deferred_dir_syncs(self) -> Generator[None, None, None]:
+        """Sync each source directory once per scan instead of once per moved file."""
+        if self._deferred_syncs is not None:
+            yield
+            return
+        self._deferred_syncs = set()
+        try:
+            yield
+        finally:
+            pending, self._deferred_syncs = self._deferred_syncs, None
+            for directory in pending:
+                try:
+                    _fsync_dir(directory)
+                except OSError as e:
+                    logger.warning("Failed to sync directory {}: {}", directory, e)
+
+    def _existing_shards(self) -> set[str]:
+        """Names of the shard directories already present in processing_dir.
 
-        yield from self._process_directory_scandir(directory, recursive, ignores, tags)
+        A shard removed behind our back is still safe: atomic_move() recreates
+        missing parents and syncs them.
+        """
+        if self._processing_dir is None:
+            return set()
+        try:
+            with os.scandir(self._processing_dir) as it:
+                return {entry.name for entry in it if entry.is_dir(follow_symlinks=False)}
+        except OSError:
+            return set()
+
+    def _process_prefetched(
+        self,
+        files: Iterator[tuple[str, os.stat_result]],
+        tags: dict[str, str] | None,
+        jobs: int,
+    ) -> Iterator[ProcessResult]:
+        """Hash files in a process pool ahead of the sequential tier and DB logic.
+
+        Workers only read and hash; lookups, moves and index writes stay on this
+        connection in walk order, so results match a serial run.
+        """
+        # forkserver: the walker threads are running, and fork() with threads is unsafe
+        pool = ProcessPoolExecutor(
+            max_workers=jobs, mp_context=multiprocessing.get_context("forkserver")
+        )
+        try:
+            while batch := list(itertools.islice(files, HASH_BATCH_SIZE)):
+                # Only sizes that can collide need hashes; the rest stop at Tier 1 unread.
+                # Sizes seen once in the batch are checked against the index in one query.
+                size_counts = Counter(st.st_size for _, st in batch)
+                known_sizes = self._db.sizes_exist(
+                    size for size, count in size_counts.items() if count == 1 and size > 0
+                )
+                futures: list[Future[tuple[bytes, bytes] | None] | None] = [None] * len(batch)
+                # Submit in (device, inode) order, which tracks on-disk layout on most
+                # filesystems, so pool reads seek less; results are still used in walk order
+                for i in sorted(range(len(batch)), key=lambda j: _inode_key(batch[j][1])):
+                    path, st = batch[i]
+                    if st.st_size > 0 and (
+                        size_counts[st.st_size] > 1 or st.st_size in known_sizes
+                    ):
+                        futures[i] = pool.submit(_compute_hashes, path)
+                for (path, stat_result), future in zip(batch, futures, strict=True):
+                    hashes = future.result() if future is not None else None
+                    yield self._process_path(path, stat_result, tags, hashes)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
 
     def _process_directory_scandir(
         self,
-        directory: Path,
+        directory: Path | str,
         recursive: bool,
-        ignores: set[str],
+        ignores: _IgnoreRules,
         tags: dict[str, str] | None = None,
     ) -> Iterator[ProcessResult]:
-        """Process directory using scandir for efficient stat access."""
-        try:
-            with os.scandir(directory) as entries:
-                for entry in entries:
-                    # Skip ignored files/directories early
-                    if entry.name in ignores:
-                        continue
+        """Process directory using scandir for efficient stat access.
 
-                    try:
-                        if entry.is_file(follow_symlinks=False):
-                            stat_result = entry.stat(follow_symlinks=False)
-                            yield self.process_file(Path(entry.path), stat_result, tags=tags)
-                        elif recursive and entry.is_dir(follow_symlinks=False):
-                            yield from self._process_directory_scandir(
-                                Path(entry.path), recursive, ignores, tags
-                            )
-                    except OSError as e:
-                        logger.warning("Error accessing {}: {}", entry.path, e)
-        except OSError as e:
-            logger.warning("Error scanning directory {}: {}", directory, e)
+        Iterative depth-first walk: one generator frame however deep the tree, and
+        only the directory being listed holds an open fd. Subdirectories are visited
+        in listing order once their parent's files are done.
+        """
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            subdirs: list[str] = []
+            try:
+                with _scandir_at(current) as (prefix, entries):
+                    for entry in entries:
+                        # Skip ignored files/directories early
+                        if entry.name in ignores:
+                            continue
+
+                        path = prefix + entry.name
+                        try:
+                            if entry.is_file(follow_symlinks=False):
+                                stat_result = entry.stat(follow_symlinks=False)
+                                # process_directory() checked the connection once;
+                                # _process_path builds the one Path from the str.
+                                yield self._process_path(path, stat_result, tags)
+                            elif (
+                                recursive
+                                and entry.is_dir(follow_symlinks=False)
+                                and not ignores.skips_dir(entry.name)
+                            ):
+                                subdirs.append(path)
+                        except OSError as e:
+                            logger.warning("Error accessing {}: {}", path, e)
+            except OSError as e:
+                logger.warning("Error scanning directory {}: {}", current, e)
+            stack.extend(reversed(subdirs))
 
     def is_duplicate(self, file_path: Path | str) -> bool:
-        """Quick check if a file is a duplicate."""
-        result = self.process_file(file_path)
-        return result.result == DedupeResult.DUPLICATE
+        """Quick check if a file is a duplicate.
+
+        Read-only: walks the same tiers as process_file() but never indexes, moves
+        or promotes anything, so a unique file is left where it is.
+        """
+        self._ensure_connected()
+        file_path = Path(file_path)
+        try:
+            stat_result = os.lstat(file_path)
+            if not self._validate_stat(file_path, stat_result)[0]:
+                return False
+            return self._probe_file(file_path, stat_result.st_size)
+        except (OSError, ValueError):
+            return False
+
+    def _probe_file(self, file_path: Path, file_size: int) -> bool:
+        """Tier lookups for is_duplicate(), without any database writes."""
+        if file_size == 0:
+            return False
+        size_entry = self._db.size_lookup(file_size)
+        if size_entry is None:
+            return False
+
+        # The only file of this size is still unhashed: compare against it directly
+        # rather than promoting it
+        pending_path = size_entry[0]
+        if pending_path is not None:
+            pending = Path(pending_path)
+            if _same_path(pending, file_path):
+                return False
+            try:
+                pending_full = _compute_full_hash(pending)
+            except OSError:
+                return False
+            return pending_full == _compute_full_hash(file_path)
+
+        if file_size <= 2 * FRINGE_SIZE:
+            fringe_hash, full_hash = _compute_both_hashes(file_path)
+        else:
+            fringe_hash = _compute_fringe_hash(file_path, file_size)
+            full_hash = None
+        if not self._db.fringe_exists(fringe_hash, file_size):
+            return False
+
+        existing_full = self._db.full_lookup(full_hash or _compute_full_hash(file_path))
+        if existing_full is None:
+            return False
+        existing_path = Path(existing_full)
+        return not _same_path(existing_path, file_path)
 
     def recover_orphans(self) -> dict[str, int]:
         """Attempt to recover orphaned files."""
         self._ensure_connected()
-        orphans = self._db.get_pending_orphans()
-        recovered = 0
-        failed = 0
-
-        for orphan in orphans:
-            orphan_path = Path(orphan["orphan_path"])
-            original_path = Path(orphan["original_path"])
+        recovered: list[int] = []
+        failed: list[int] = []
 
+        # Streamed: only the ids are kept, not every orphan row. Nothing is written
+        # until the scan is done.
+        for orphan_id, original_path, orphan_path in self._db.iter_pending_orphans():
+            # One lstat, before atomic_move creates the destination's parent directories
             try:
-                if orphan_path.exists():
-                    atomic_move(orphan_path, original_path)
-                    self._db.update_orphan_status(orphan["id"], "recovered")
-                    recovered += 1
-                else:
-                    self._db.update_orphan_status(orphan["id"], "failed")
-                    failed += 1
+                os.lstat(orphan_path)
+            except FileNotFoundError:
+                failed.append(orphan_id)
+                continue
+            try:
+                atomic_move(Path(orphan_path), Path(original_path))
+                recovered.append(orphan_id)
             except OSError:
-                self._db.update_orphan_status(orphan["id"], "failed")
-                failed += 1
+                failed.append(orphan_id)
 
-        return {"recovered": recovered, "failed": failed, "total": len(orphans)}
+        # Statuses are bookkeeping, not move state: one commit covers the whole pass.
+        # After a crash before it, the next pass finds moved-back orphans gone and
+        # marks them failed; the files themselves are already home.
+        total = len(recovered) + len(failed)
+        if total:
+            self._db.begin_transaction()
+            try:
+                self._db.update_orphan_statuses(recovered, "recovered")
+                self._db.update_orphan_statuses(failed, "failed")
+                self._db.commit()
+            except Exception:
+                self._db.rollback()
+                raise
+
+        return {"recovered": len(recovered), "failed": len(failed), "total": total}
 
     def list_orphans(self) -> list[dict]:
         """List all pending orphan records."""
@@ -993,17 +1726,14 @@ class FileDeduplicator:
     def stats(self) -> dict[str, int | str]:
         """Get database and engine statistics."""
         self._ensure_connected()
-        db = self._db.db
-
-        size_count = db.execute("SELECT COUNT(*) FROM size_index").fetchone()[0]
-        fringe_count = db.execute("SELECT COUNT(*) FROM fringe_index").fetchone()[0]
-        full_count = db.execute("SELECT COUNT(*) FROM full_index").fetchone()[0]
+        counts = self._db.get_counts()
 
         return {
-            "unique_sizes": size_count,
-            "fringe_entries": fringe_count,
-            "full_entries": full_count,
+            "unique_sizes": counts["unique_sizes"],
+            "fringe_entries": counts["fringe_entries"],
+            "full_entries": counts["full_entries"],
+            "pending_hashes": counts["pending_hashes"],
             "schema_version": self._db.schema_version,
-            "orphan_count": self._db.get_orphan_count(),
-            "pending_journal": self._db.get_pending_journal_count(),
+            "orphan_count": counts["orphan_count"],
+            "pending_journal": counts["pending_journal"],
         }
@@ -2,18 +2,29 @@
 
 from __future__ import annotations
 
+import contextlib
+import errno
+import inspect
+import io
 import os
+import sqlite3
+import sys
 import tempfile
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
+import xxhash
 
-from bgate_unix.db import DedupeDatabase
+from bgate_unix.db import COUNTED_ROWS, COUNTER_TRIGGERS, PAGE_SIZE, DedupeDatabase
 from bgate_unix.engine import (
     CHUNK_SIZE,
     FRINGE_SIZE,
     DedupeResult,
     FileDeduplicator,
+    _compute_both_hashes,
+    _compute_fringe_hash,
+    _compute_full_hash,
     atomic_move,
 )
 
@@ -54,6 +65,19 @@ def processing_dir(temp_dir: Path) -> Path:
     return processing
 
 
+class _ShortReadFileIO(io.FileIO):
+    """FileIO whose reads return at most 4 KiB, like NFS/FUSE or an interrupted read."""
+
+    def readinto(self, buffer):
+        return super().readinto(memoryview(buffer)[:4096])
+
+
+def _short_reads():
+    return patch(
+        "bgate_unix.engine._open_for_hashing", side_effect=lambda p: _ShortReadFileIO(p, "rb")
+    )
+
+
 class TestAtomicMove:
     """Test atomic file move operation."""
 
@@ -130,13 +154,21 @@ class TestDedupeDatabase:
             db.add_size(1000)
             assert db.size_exists(1000)
 
+    def test_sizes_exist_batch(self, db_path: Path):
+        """sizes_exist should return only the indexed sizes from the batch."""
+        with DedupeDatabase(db_path) as db:
+            db.add_size(100)
+            db.add_size(300)
+            assert db.sizes_exist([100, 200, 300, 400]) == {100, 300}
+            assert db.sizes_exist([]) == set()
+
     def test_fringe_operations_blob(self, db_path: Path):
         """Fringe index operations should work with BLOB hashes."""
         with DedupeDatabase(db_path) as db:
             fringe_hash = b"\x01\x02\x03\x04\x05\x06\x07\x08"
-            assert db.fringe_lookup(fringe_hash, 1000) is None
-            db.add_fringe(fringe_hash, 1000, "/path/to/file")
-            assert db.fringe_lookup(fringe_hash, 1000) == "/path/to/file"
+            assert not db.fringe_exists(fringe_hash, 1000)
+            db.add_fringe(fringe_hash, 1000)
+            assert db.fringe_exists(fringe_hash, 1000)
 
     def test_full_operations_blob(self, db_path: Path):
         """Full hash index operations should work with BLOB hashes."""
@@ -149,7 +181,284 @@ class TestDedupeDatabase:
     def test_schema_version(self, db_path: Path):
         """Schema version should be set correctly."""
         with DedupeDatabase(db_path) as db:
-            assert db.schema_version == 4
+            assert db.schema_version == 11
+
+    def test_batch_rollback_keeps_earlier_units(self, db_path: Path):
+        """Rolling back one unit inside a batch should not discard earlier units."""
+        with DedupeDatabase(db_path) as db:
+            with db.batch():
+                db.begin_transaction()
+                db.add_size(1000)
+                db.commit()
+
+                db.begin_transaction()
+                db.add_size(2000)
+                db.rollback()
+
+                # Units are still pending in the outer transaction
+                assert db.db.conn.in_transaction
+
+            assert not db.db.conn.in_transaction
+            assert db.size_exists(1000)
+            assert not db.size_exists(2000)
+
+    def test_batch_durable_commit_flushes(self, db_path: Path):
+        """A durable commit inside a batch should persist immediately."""
+        with DedupeDatabase(db_path) as db, db.batch():
+            db.begin_transaction()
+            db.journal_move("/src/file.txt", "/dest/file.txt", 1000)
+            db.commit(durable=True)
+
+            assert not db.db.conn.in_transaction
+
+    def test_only_durable_commits_sync_wal(self, db_path: Path):
+        """Under synchronous=NORMAL, only durable commits should fsync the WAL."""
+        with DedupeDatabase(db_path) as db, patch("bgate_unix.db.os.fsync") as fsync:
+            db.begin_transaction()
+            db.add_size(1000)
+            db.commit()
+            fsync.assert_not_called()
+
+            db.begin_transaction()
+            db.journal_move("/src/file.txt", "/dest/file.txt", 1000)
+            db.commit(durable=True)
+            fsync.assert_called_once()
+
+    def test_counts_in_one_query(self, db_path: Path):
+        """get_counts should report every stats count from a single statement."""
+        with DedupeDatabase(db_path) as db:
+            db.add_size(100, "/pending", None)
+            db.add_size(200)
+            db.add_fringe(b"f" * 8, 200)
+            db.add_full(b"h" * 16, "/a")
+            db.add_orphan("/orig", "/orphan", 1)
+            db.journal_move("/src", "/dest", 1)
+
+            statements: list[str] = []
+            db.conn.set_trace_callback(statements.append)
+            assert db.get_counts() == {
+                "unique_sizes": 2,
+                "fringe_entries": 1,
+                "full_entries": 1,
+                "pending_hashes": 1,
+                "orphan_count": 1,
+                "pending_journal": 1,
+            }
+            assert len(statements) == 1
+
+    def test_row_counts_track_writes(self, db_path: Path):
+        """Triggers should keep row_counts equal to COUNT(*), ignoring conflicting inserts."""
+        with DedupeDatabase(db_path) as db:
+            db.add_size(100, "/pending", None)
+            db.add_size(100, "/other", None)
+            db.add_size(200)
+            db.clear_pending_size(100)
+            db.add_fringe(b"f" * 8, 200)
+            db.add_fringe(b"f" * 8, 200)
+            db.add_full(b"h" * 16, "/a")
+            db.add_full(b"h" * 16, "/b")
+
+            counts = db.get_counts()
+            for name, count_sql in COUNTED_ROWS.items():
+                assert (
+                    db.db.execute(count_sql).fetchone()[0]
+                    == db.db.execute(
+                        "SELECT value FROM row_counts WHERE name = ?", [name]
+                    ).fetchone()[0]
+                )
+            assert (counts["unique_sizes"], counts["pending_hashes"]) == (2, 0)
+            assert (counts["fringe_entries"], counts["full_entries"]) == (1, 1)
+
+    def test_without_wal_commits_are_full_sync(self):
+        """If WAL is refused, fall back to synchronous=FULL and skip the WAL fsync."""
+        with DedupeDatabase(":memory:") as db, patch("bgate_unix.db.os.fsync") as fsync:
+            assert db.conn.execute("PRAGMA synchronous").fetchone()[0] == 2
+            db.begin_transaction()
+            db.journal_move("/src/file.txt", "/dest/file.txt", 1000)
+            db.commit(durable=True)
+            fsync.assert_not_called()
+
+    def test_bulk_mode_enforces_uniqueness_and_rebuilds_indexes(self, db_path: Path):
+        """Bulk mode should dedupe in memory and restore the unique indexes on exit."""
+        with DedupeDatabase(db_path) as db:
+            with db.bulk_mode():
+                assert db.add_full(b"hash", "/a")
+                assert not db.add_full(b"hash", "/b")
+                assert db.full_lookup(b"hash") == "/a"
+
+                db.begin_transaction()
+                assert db.add_full(b"other", "/c")
+                db.rollback()
+                assert db.full_lookup(b"other") is None
+
+            indexes = {
+                row[0]
+                for row in db.db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+            }
+            assert "idx_full_hash" in indexes
+            assert not db.add_full(b"hash", "/d")
+
+    def test_bulk_mode_locks_out_other_connections(self, db_path: Path):
+        """No other connection may write while the unique index is dropped."""
+        other = sqlite3.connect(db_path, timeout=0, isolation_level=None)
+        try:
+            with DedupeDatabase(db_path) as db:
+                with db.bulk_mode():
+                    db.add_full(b"hash", "/a")
+                    with pytest.raises(sqlite3.OperationalError, match="locked"):
+                        other.execute(
+                            "INSERT INTO full_index (full_hash, file_path) VALUES (?, ?)",
+                            (b"hash", "/b"),
+                        )
+                other.execute("SELECT COUNT(*) FROM full_index").fetchone()
+                with pytest.raises(sqlite3.IntegrityError):
+                    other.execute(
+                        "INSERT INTO full_index (full_hash, file_path) VALUES (?, ?)",
+                        (b"hash", "/b"),
+                    )
+        finally:
+            other.close()
+
+    def test_bulk_mode_skipped_when_full_index_has_rows(self, db_path: Path):
+        """A non-empty full_index keeps its unique index through bulk_mode."""
+        with DedupeDatabase(db_path) as db:
+            db.add_full(b"hash", "/a")
+            with db.bulk_mode():
+                indexes = {
+                    row[0]
+                    for row in db.db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+                }
+                assert "idx_full_hash" in indexes
+
+    def test_bulk_mode_rebuilds_index_after_interrupted_unit(self, db_path: Path):
+        """An open batch unit must not roll the rebuilt unique index back."""
+        with DedupeDatabase(db_path) as db:
+            with pytest.raises(KeyboardInterrupt), db.batch(), db.bulk_mode():
+                db.begin_transaction()
+                db.add_full(b"kept", "/a")
+                db.commit()
+                db.begin_transaction()
+                db.add_full(b"lost", "/b")
+                raise KeyboardInterrupt
+
+            plan = db.conn.execute(
+                "EXPLAIN QUERY PLAN SELECT file_path FROM full_index WHERE full_hash = ?",
+                (b"kept",),
+            ).fetchall()
+            assert any("idx_full_hash" in row[-1] for row in plan)
+            assert db.full_lookup(b"kept") == "/a"
+            assert db.full_lookup(b"lost") is None
+            assert not db.add_full(b"kept", "/c")
+
+    def test_hash_filters_grow_without_false_negatives(self, db_path: Path):
+        """Lookups stay exact as the negative-lookup filters are outgrown and reloaded."""
+        with (
+            patch("bgate_unix.db.FILTER_MIN_ENTRIES", 4),
+            DedupeDatabase(db_path) as db,
+            db.batch(),
+        ):
+            assert db.full_lookup(b"missing") is None
+            assert not db.fringe_exists(b"missing", 1)
+            for i in range(50):
+                full_hash = i.to_bytes(16, "little")
+                db.add_full(full_hash, f"/file{i}")
+                db.add_fringe(full_hash[:8], i)
+                assert db.full_lookup(full_hash) == f"/file{i}"
+                assert db.fringe_exists(full_hash[:8], i)
+            assert all(db.full_lookup(i.to_bytes(16, "little")) for i in range(50))
+            assert db.full_lookup(b"missing") is None
+            assert not db.fringe_exists(b"\x00" * 8, 1)
+
+    def test_hash_filters_load_only_inside_batches(self, db_path: Path):
+        """One-off lookups query the index; only a batch pays the filter's table scan."""
+        with DedupeDatabase(db_path) as db:
+            db.add_full(b"hash", "/a")
+            db.add_fringe(b"fringe!!", 1)
+            with patch.object(db, "_load_filter", wraps=db._load_filter) as load:
+                assert db.full_lookup(b"hash") == "/a"
+                assert db.full_lookup(b"missing") is None
+                assert db.fringe_exists(b"fringe!!", 1)
+                assert not db.fringe_exists(b"missing", 1)
+                load.assert_not_called()
+
+                with db.batch():
+                    assert db.full_lookup(b"missing") is None
+                    assert db.fringe_exists(b"fringe!!", 1)
+                    assert db.full_lookup(b"hash") == "/a"
+                assert load.call_count == 2
+
+                assert db.full_lookup(b"hash") == "/a"
+                assert load.call_count == 2
+
+    def test_hash_filters_wait_for_enough_batch_lookups(self, db_path: Path):
+        """A batch probes the index until its lookups would pay for the table scan."""
+        with DedupeDatabase(db_path) as db:
+            for i in range(10):
+                db.add_full(i.to_bytes(16, "little"), f"/file{i}")
+            with patch.object(db, "_load_filter", wraps=db._load_filter) as load, db.batch():
+                for _ in range(5):
+                    assert db.full_lookup(b"missing") is None
+                load.assert_not_called()
+                assert db.full_lookup(b"missing") is None
+                load.assert_called_once()
+                assert all(db.full_lookup(i.to_bytes(16, "little")) for i in range(10))
+                load.assert_called_once()
+
+    def test_get_all_paths_yields_each_path_once(self, db_path: Path):
+        """Paths indexed under several hashes should be yielded once."""
+        with DedupeDatabase(db_path) as db:
+            db.add_full(b"a", "/x")
+            db.add_full(b"b", "/x")
+            db.add_full(b"c", "/y")
+            assert sorted(db.get_all_paths()) == ["/x", "/y"]
+
+    def test_recovery_queries_use_partial_indexes(self, db_path: Path):
+        """Pending-row scans should read only the partial indexes."""
+        with DedupeDatabase(db_path) as db:
+            for query, index in (
+                (
+                    "SELECT COUNT(*) FROM orphan_registry WHERE status = 'pending'",
+                    "idx_orphan_pending",
+                ),
+                (
+                    "SELECT COUNT(*) FROM move_journal WHERE phase NOT IN ('completed', 'failed')",
+                    "idx_journal_incomplete",
+                ),
+            ):
+                plan = db.db.execute(f"EXPLAIN QUERY PLAN {query}").fetchall()
+                assert index in plan[0][3]
+
+    def test_new_database_uses_large_pages(self, db_path: Path):
+        """New databases should be created with the wider page size."""
+        with DedupeDatabase(db_path) as db:
+            assert db.db.execute("PRAGMA page_size").fetchone()[0] == PAGE_SIZE
+
+    def test_background_checkpoints_replace_autocheckpoint(self, db_path: Path):
+        """Commits inside background_checkpoints() should not checkpoint on their own."""
+        with DedupeDatabase(db_path) as db:
+            with db.background_checkpoints(interval=60):
+                assert db.conn.execute("PRAGMA wal_autocheckpoint").fetchone()[0] == 0
+                db.begin_transaction()
+                db.add_size(100)
+                db.commit()
+                busy, wal_frames, checkpointed = db.checkpoint()
+                assert busy == 0
+                assert wal_frames == checkpointed > 0
+            assert db.conn.execute("PRAGMA wal_autocheckpoint").fetchone()[0] == 1000
+
+    def test_close_reclaims_free_pages(self, db_path: Path):
+        """New databases use incremental auto_vacuum, and close returns free pages."""
+        with DedupeDatabase(db_path) as db:
+            assert db.db.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+            db.begin_transaction()
+            for i in range(2000):
+                db.add_full(i.to_bytes(16, "big"), f"/some/long/path/{i:08d}.bin")
+            db.commit()
+            db.db.execute("DELETE FROM full_index")
+            assert db.db.execute("PRAGMA freelist_count").fetchone()[0] > 0
+
+        with DedupeDatabase(db_path) as db:
+            assert db.db.execute("PRAGMA freelist_count").fetchone()[0] == 0
 
     def test_move_journal(self, db_path: Path):
         """Move journal operations should work correctly."""
@@ -161,10 +470,15 @@ class TestDedupeDatabase:
             assert len(entries) == 1
             assert entries[0]["phase"] == "planned"
 
-            db.update_move_phase(journal_id, "completed")
+            assert db.update_move_phase(journal_id, "completed")
             entries = db.get_incomplete_journal_entries()
             assert len(entries) == 0
 
+            # Terminal phases are final
+            assert not db.update_move_phase(journal_id, "failed")
+            row = db.conn.execute("SELECT phase FROM move_journal WHERE id = ?", (journal_id,))
+            assert row.fetchone()[0] == "completed"
+
 
 class TestTier0EmptyFiles:
     """Test Tier 0: Empty file handling."""
@@ -213,6 +527,55 @@ class TestTier1SizeCheck:
         assert result1.result == DedupeResult.UNIQUE
         assert result2.result == DedupeResult.UNIQUE
 
+    def test_unique_size_is_not_read(self, deduplicator: FileDeduplicator, temp_dir: Path):
+        """A size-unique file should be registered without hashing it."""
+        file1 = temp_dir / "file1.txt"
+        file1.write_bytes(b"a" * 100)
+
+        with (
+            patch("bgate_unix.engine._compute_fringe_hash") as fringe,
+            patch("bgate_unix.engine._compute_full_hash") as full,
+        ):
+            result = deduplicator.process_file(file1)
+
+        assert result.tier == 1
+        fringe.assert_not_called()
+        full.assert_not_called()
+        assert deduplicator.stats["pending_hashes"] == 1
+
+    def test_pending_entry_promoted_with_tags(self, db_path: Path, temp_dir: Path):
+        """A second same-size file should hash the pending one, keeping its tags."""
+        content = os.urandom(100)
+        file1 = temp_dir / "original.txt"
+        file2 = temp_dir / "duplicate.txt"
+        file1.write_bytes(content)
+        file2.write_bytes(content)
+
+        with FileDeduplicator(db_path) as deduper:
+            deduper.process_file(file1, tags={"source": "a"})
+            result = deduper.process_file(file2)
+
+            assert result.result == DedupeResult.DUPLICATE
+            assert result.duplicate_of == file1
+            assert deduper.stats["pending_hashes"] == 0
+            row = deduper._db.db.execute("SELECT metadata FROM full_index").fetchone()
+            assert row[0] == '{"source": "a"}'
+
+    def test_missing_pending_entry_dropped(self, deduplicator: FileDeduplicator, temp_dir: Path):
+        """A pending file that vanished should not block later files of that size."""
+        file1 = temp_dir / "gone.txt"
+        file2 = temp_dir / "same_size.txt"
+        file1.write_bytes(os.urandom(100))
+        file2.write_bytes(os.urandom(100))
+
+        deduplicator.process_file(file1)
+        file1.unlink()
+        result = deduplicator.process_file(file2)
+
+        assert result.result == DedupeResult.UNIQUE
+        assert result.tier == 2
+        assert deduplicator.stats["pending_hashes"] == 0
+
 
 class TestTier2FringeHash:
     """Test Tier 2: Fringe hash deduplication."""
@@ -233,6 +596,46 @@ class TestTier2FringeHash:
         assert result2.result == DedupeResult.UNIQUE
         assert result2.tier >= 2
 
+    def test_small_file_hashed_in_one_read(self, deduplicator: FileDeduplicator, temp_dir: Path):
+        """Files within two fringe windows should get both hashes from a single read."""
+        content = os.urandom(2 * FRINGE_SIZE)
+        (temp_dir / "file1.bin").write_bytes(content)
+        (temp_dir / "file2.bin").write_bytes(content)
+        deduplicator.process_file(temp_dir / "file1.bin")
+
+        with (
+            patch("bgate_unix.engine._compute_fringe_hash") as fringe,
+            patch("bgate_unix.engine._compute_full_hash") as full,
+        ):
+            result = deduplicator.process_file(temp_dir / "file2.bin")
+
+        assert result.result == DedupeResult.DUPLICATE
+        fringe.assert_not_called()
+        full.assert_not_called()
+
+    @pytest.mark.parametrize("fragmented", [False, True])
+    @pytest.mark.parametrize("size", [1, FRINGE_SIZE, FRINGE_SIZE + 6 * 1024, 3 * FRINGE_SIZE])
+    def test_fringe_digest_matches_stored_format(self, temp_dir: Path, size: int, fragmented: bool):
+        """Fringe digests must stay xxh3_64(head + tail + size), however reads are split."""
+        path = temp_dir / "fringe.bin"
+        content = os.urandom(size)
+        path.write_bytes(content)
+        tail = content[-FRINGE_SIZE:] if size > FRINGE_SIZE else b""
+        expected = xxhash.xxh3_64_digest(content[:FRINGE_SIZE] + tail + size.to_bytes(8, "little"))
+
+        with _short_reads() if fragmented else contextlib.nullcontext():
+            assert _compute_fringe_hash(path) == expected
+            assert _compute_both_hashes(path)[0] == expected
+
+    def test_fringe_digest_survives_short_reads(self, temp_dir: Path):
+        """Partial reads must not change which bytes the fringe covers."""
+        path = temp_dir / "fringe.bin"
+        path.write_bytes(os.urandom(3 * FRINGE_SIZE))
+        expected = _compute_fringe_hash(path)
+
+        with _short_reads():
+            assert _compute_fringe_hash(path) == expected
+
     def test_large_file_fringe_hash(self, deduplicator: FileDeduplicator, temp_dir: Path):
         """Large files should use fringe hash correctly."""
         file1 = temp_dir / "large1.bin"
@@ -258,7 +661,60 @@ class TestTier2FringeHash:
 
 
 class TestTier3FullHash:
-    """Test Tier 3: Full content hash deduplication (xxHash128)."""
+    """Test Tier 3: Full content hash deduplication (XXH3-128)."""
+
+    @pytest.mark.parametrize(
+        "size",
+        [
+            1,
+            FRINGE_SIZE - 1,
+            FRINGE_SIZE,
+            FRINGE_SIZE + 1,
+            2 * FRINGE_SIZE + 5,
+            CHUNK_SIZE - 1,
+            CHUNK_SIZE,
+            CHUNK_SIZE * 2 + 7,
+        ],
+    )
+    def test_single_pass_hashes_match(self, temp_dir: Path, size: int):
+        """The fused single-read hash should equal the separate fringe and full hashes."""
+        path = temp_dir / "file.bin"
+        path.write_bytes(os.urandom(size))
+        assert _compute_both_hashes(path) == (_compute_fringe_hash(path), _compute_full_hash(path))
+        assert _compute_full_hash(path) == xxhash.xxh3_128_digest(path.read_bytes())
+
+    def test_full_hash_matches_one_shot_digest(self, temp_dir: Path):
+        """Chunked hashing should equal xxh3_128 over the whole content."""
+        path = temp_dir / "multi_chunk.bin"
+        content = os.urandom(CHUNK_SIZE * 2 + 123)
+        path.write_bytes(content)
+        assert _compute_full_hash(path) == xxhash.xxh3_128_digest(content)
+
+    @pytest.mark.parametrize("size", [100, CHUNK_SIZE - 1, 300 * 1024])
+    def test_full_hash_survives_short_reads(self, temp_dir: Path, size: int):
+        """A short read is not EOF: the digest must still cover the whole file."""
+        path = temp_dir / "short.bin"
+        content = os.urandom(size)
+        path.write_bytes(content)
+
+        with _short_reads():
+            assert _compute_full_hash(path) == xxhash.xxh3_128_digest(content)
+            assert _compute_both_hashes(path)[1] == xxhash.xxh3_128_digest(content)
+
+    def test_hashing_falls_back_when_noatime_refused(self, temp_dir: Path):
+        """Files we don't own reject O_NOATIME with EPERM; hashing should reopen normally."""
+        path = temp_dir / "foreign.bin"
+        content = os.urandom(100)
+        path.write_bytes(content)
+        real_open = os.open
+
+        def refuse_noatime(file, flags, *args):
+            if flags & getattr(os, "O_NOATIME", 0):
+                raise PermissionError(errno.EPERM, "Operation not permitted")
+            return real_open(file, flags, *args)
+
+        with patch("bgate_unix.engine.os.open", side_effect=refuse_noatime):
+            assert _compute_full_hash(path) == xxhash.xxh3_128_digest(content)
 
     def test_exact_duplicate_detected(self, deduplicator: FileDeduplicator, temp_dir: Path):
         """Exact binary duplicates should be detected."""
@@ -275,6 +731,43 @@ class TestTier3FullHash:
         assert result2.result == DedupeResult.DUPLICATE
         assert result2.duplicate_of == file1
 
+    def test_reprocessing_via_alias_path_is_not_duplicate(
+        self, deduplicator: FileDeduplicator, temp_dir: Path
+    ):
+        """The same file reached through a different spelling must not be its own duplicate."""
+        (temp_dir / "sub").mkdir()
+        file_path = temp_dir / "file.txt"
+        file_path.write_bytes(b"same inode")
+        other = temp_dir / "other.txt"
+        other.write_bytes(b"diff inode")
+
+        deduplicator.process_file(file_path)
+        deduplicator.process_file(other)
+        result = deduplicator.process_file(temp_dir / "sub" / ".." / "file.txt")
+
+        assert result.result == DedupeResult.UNIQUE
+        assert result.tier == 3
+
+    def test_hard_link_to_indexed_file_is_duplicate(
+        self, deduplicator: FileDeduplicator, temp_dir: Path
+    ):
+        """A hard link shares the inode but is another path, so it is still a duplicate."""
+        original = temp_dir / "original.bin"
+        original.write_bytes(os.urandom(100))
+        other = temp_dir / "other.bin"
+        other.write_bytes(os.urandom(100))
+        link = temp_dir / "link.bin"
+        os.link(original, link)
+
+        deduplicator.process_file(original)
+        assert deduplicator.is_duplicate(link)  # against the unhashed Tier 1 entry
+        deduplicator.process_file(other)
+
+        assert deduplicator.is_duplicate(link)
+        result = deduplicator.process_file(link)
+        assert result.result == DedupeResult.DUPLICATE
+        assert result.duplicate_of == original
+
     def test_large_duplicate_detected(self, deduplicator: FileDeduplicator, temp_dir: Path):
         """Large exact duplicates should be detected."""
         file1 = temp_dir / "large1.bin"
@@ -324,6 +817,40 @@ class TestProcessingDirectory:
             assert result.result == DedupeResult.DUPLICATE
             assert file2.exists()
 
+    def test_is_duplicate_is_read_only(
+        self, db_path: Path, inbound_dir: Path, processing_dir: Path
+    ):
+        """is_duplicate should answer from the tiers without indexing or moving anything."""
+        content = os.urandom(100)
+        with FileDeduplicator(db_path, processing_dir=processing_dir) as deduper:
+            original = inbound_dir / "original.bin"
+            original.write_bytes(content)
+            deduper.process_file(original)
+            copy = inbound_dir / "copy.bin"
+            copy.write_bytes(content)
+            same_size = inbound_dir / "same_size.bin"
+            same_size.write_bytes(os.urandom(100))
+            new_size = inbound_dir / "new_size.bin"
+            new_size.write_bytes(os.urandom(50))
+            before = deduper.stats
+
+            # Against the unhashed Tier 1 entry
+            assert deduper.is_duplicate(copy)
+            assert not deduper.is_duplicate(same_size)
+            assert not deduper.is_duplicate(new_size)
+            assert deduper.stats == before
+
+            # Against hashed entries, once a second file of that size is indexed
+            other = inbound_dir / "other.bin"
+            other.write_bytes(os.urandom(100))
+            deduper.process_file(other)
+            before = deduper.stats
+            assert deduper.is_duplicate(copy)
+            assert not deduper.is_duplicate(same_size)
+            assert deduper.stats == before
+
+            assert copy.exists() and same_size.exists() and new_size.exists()
+
     def test_name_collision_handling(self, db_path: Path, inbound_dir: Path, processing_dir: Path):
         """Should handle multiple unique files with hash-based naming."""
         with FileDeduplicator(db_path, processing_dir=processing_dir) as deduper:
@@ -373,6 +900,172 @@ class TestDirectoryProcessing:
         results = list(deduplicator.process_directory(test_dir, recursive=True))
         assert len(results) == 2
 
+    def test_deep_tree_does_not_recurse(self, deduplicator: FileDeduplicator, temp_dir: Path):
+        """A serial walk deeper than the recursion headroom should still finish."""
+        current = test_dir = temp_dir / "deep"
+        for depth in range(300):
+            current = current / "d"
+            current.mkdir(parents=True)
+            (current / f"f{depth}.bin").write_bytes(os.urandom(8) + depth.to_bytes(2, "big"))
+
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(len(inspect.stack()) + 150)
+        try:
+            results = list(deduplicator.process_directory(test_dir, recursive=True))
+        finally:
+            sys.setrecursionlimit(limit)
+        assert len(results) == 300
+
+    def test_bulk_scan_interrupted_in_tier3_keeps_index(
+        self, deduplicator: FileDeduplicator, temp_dir: Path
+    ):
+        """Interrupting a bulk scan mid-hash still leaves idx_full_hash in place."""
+        test_dir = temp_dir / "bulk"
+        test_dir.mkdir()
+        (test_dir / "a.bin").write_bytes(b"same content")
+        (test_dir / "b.bin").write_bytes(b"same content")
+
+        with (
+            patch("bgate_unix.engine._compute_full_hash", side_effect=KeyboardInterrupt),
+            patch("bgate_unix.engine._compute_both_hashes", side_effect=KeyboardInterrupt),
+            pytest.raises(KeyboardInterrupt),
+        ):
+            list(deduplicator.process_directory(test_dir, bulk=True))
+
+        indexes = {
+            row[0]
+            for row in deduplicator._db.db.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'full_index'"
+            )
+        }
+        assert "idx_full_hash" in indexes
+
+    def test_scan_without_bulk_leaves_database_readable(
+        self, deduplicator: FileDeduplicator, db_path: Path, temp_dir: Path
+    ):
+        """By default another connection can read the index while a scan runs."""
+        test_dir = temp_dir / "shared"
+        test_dir.mkdir()
+        for i in range(3):
+            (test_dir / f"file{i}.bin").write_bytes(b"x" * (i + 1))
+
+        other = sqlite3.connect(db_path, timeout=0, isolation_level=None)
+        try:
+            scan = deduplicator.process_directory(test_dir)
+            next(scan)
+            assert other.execute("SELECT count(*) FROM size_index").fetchone()[0] >= 0
+            scan.close()
+        finally:
+            other.close()
+
+    def test_walk_closes_directory_fds(self, deduplicator: FileDeduplicator, temp_dir: Path):
+        """Listing through directory fds should report full paths and close every fd."""
+        test_dir = temp_dir / "fds"
+        (test_dir / "a" / "b").mkdir(parents=True)
+        (test_dir / "top.bin").write_bytes(b"t")
+        (test_dir / "a" / "b" / "leaf.bin").write_bytes(b"leaf")
+        fd_dir = Path("/proc/self/fd")
+        db_name = str(deduplicator._db.db_path)
+
+        def walk_fds() -> int:
+            # SQLite may park a closed checkpoint connection's database fd for reuse
+            count = 0
+            for fd in fd_dir.iterdir():
+                with contextlib.suppress(OSError):
+                    count += not str(fd.readlink()).startswith(db_name)
+            return count
+
+        results = list(deduplicator.process_directory(str(test_dir) + "/"))
+        open_fds = walk_fds()
+        list(deduplicator.process_directory(test_dir))
+        partial = deduplicator.process_directory(test_dir)
+        next(partial)
+        partial.close()
+
+        assert {r.original_path for r in results} == {
+            test_dir / "top.bin",
+            test_dir / "a" / "b" / "leaf.bin",
+        }
+        assert walk_fds() == open_fds
+
+    def test_parallel_walk_matches_serial(self, db_path: Path, temp_dir: Path):
+        """A parallel walk should visit exactly the files a serial walk does."""
+        test_dir = temp_dir / "tree"
+        for i in range(4):
+            sub = test_dir / f"d{i}" / "nested"
+            sub.mkdir(parents=True)
+            (sub.parent / f"top{i}.bin").write_bytes(os.urandom(10 + i))
+            (sub / f"leaf{i}.bin").write_bytes(os.urandom(50 + i))
+        (test_dir / "node_modules").mkdir()
+        (test_dir / "node_modules" / "ignored.js").write_bytes(b"x")
+
+        with FileDeduplicator(db_path) as deduper:
+            serial = {r.original_path for r in deduper.process_directory(test_dir)}
+        with FileDeduplicator(temp_dir / "parallel.db") as deduper:
+            parallel = {r.original_path for r in deduper.process_directory(test_dir, jobs=4)}
+
+        assert len(serial) == 8
+        assert parallel == serial
+
+    def test_ignore_patterns_match_names_and_globs(
+        self, deduplicator: FileDeduplicator, temp_dir: Path
+    ):
+        """Ignore patterns should skip exact names and glob matches."""
+        test_dir = temp_dir / "ignores"
+        (test_dir / "build").mkdir(parents=True)
+        (test_dir / "build" / "out.bin").write_bytes(b"built")
+        (test_dir / "keep.txt").write_bytes(b"keep")
+        (test_dir / "scratch.tmp").write_bytes(b"temp")
+        (test_dir / "cache-1.log").write_bytes(b"log")
+
+        results = deduplicator.process_directory(
+            test_dir, ignore_patterns=["build", "*.tmp", "cache-?.log"]
+        )
+
+        assert [r.original_path.name for r in results] == ["keep.txt"]
+
+    def test_bgateignore_directory_patterns(self, deduplicator: FileDeduplicator, temp_dir: Path):
+        """Trailing-slash lines in .bgateignore skip directories only, as in gitignore."""
+        test_dir = temp_dir / "dirignore"
+        (test_dir / "build").mkdir(parents=True)
+        (test_dir / "build" / "out.bin").write_bytes(b"built")
+        (test_dir / "sub" / "cache").mkdir(parents=True)
+        (test_dir / "sub" / "cache" / "c.bin").write_bytes(b"cached")
+        (test_dir / "sub" / "build").write_bytes(b"a file named build")
+        (test_dir / "mod.pyc").write_bytes(b"bytecode")
+        (test_dir / "keep.txt").write_bytes(b"keep")
+        (test_dir / ".bgateignore").write_text("# generated\nbuild/\nca*/\n*.pyc\n")
+
+        for jobs in (1, 2):
+            results = deduplicator.process_directory(
+                test_dir, ignore_patterns=[".bgateignore"], jobs=jobs
+            )
+            assert sorted(r.original_path.name for r in results) == ["build", "keep.txt"]
+
+    @pytest.mark.parametrize("jobs", [2, 0])
+    def test_pooled_hashing_finds_duplicates(
+        self, deduplicator: FileDeduplicator, temp_dir: Path, jobs: int
+    ):
+        """Hashes computed in the worker pool should drive the same tier decisions."""
+        test_dir = temp_dir / "pooled"
+        test_dir.mkdir()
+        content = os.urandom(200_000)
+        (test_dir / "a.bin").write_bytes(content)
+        (test_dir / "b.bin").write_bytes(content)
+        (test_dir / "c.bin").write_bytes(content[:-1] + b"\x00")
+        (test_dir / "empty.bin").write_bytes(b"")
+
+        results = {
+            r.original_path.name: r
+            for r in deduplicator.process_directory(test_dir, recursive=False, jobs=jobs)
+        }
+
+        assert results["empty.bin"].result == DedupeResult.SKIPPED
+        dupes = [r for r in results.values() if r.result == DedupeResult.DUPLICATE]
+        assert len(dupes) == 1
+        assert dupes[0].tier == 3
+        assert results["c.bin"].result == DedupeResult.UNIQUE
+
 
 class TestStats:
     """Test statistics reporting."""
@@ -389,8 +1082,9 @@ class TestStats:
 
         stats = deduplicator.stats
         assert stats["unique_sizes"] == 2
-        assert stats["full_entries"] == 2
-        assert stats["schema_version"] == 4
+        assert stats["full_entries"] == 0
+        assert stats["pending_hashes"] == 2
+        assert stats["schema_version"] == 11
         assert "pending_journal" in stats
 
 
@@ -411,6 +1105,33 @@ class TestErrorHandling:
         with pytest.raises(ValueError, match="Not a directory"):
             list(deduplicator.process_directory(file_path))
 
+    def test_supplied_lstat_rejects_symlink(self, deduplicator: FileDeduplicator, temp_dir: Path):
+        """A supplied lstat result should be validated like a fresh path check."""
+        target = temp_dir / "target.txt"
+        target.write_bytes(b"data")
+        link = temp_dir / "link.txt"
+        link.symlink_to(target)
+
+        result = deduplicator.process_file(link, link.lstat())
+
+        assert result.result == DedupeResult.SKIPPED
+        assert result.error == "Validation failed: Symlinks not supported"
+
+    def test_direct_call_lstats_once(self, deduplicator: FileDeduplicator, temp_dir: Path):
+        """Without a supplied lstat the path is stat'ed once, and symlinks are still rejected."""
+        file_path = temp_dir / "file.txt"
+        file_path.write_bytes(b"data")
+        link = temp_dir / "link.txt"
+        link.symlink_to(file_path)
+
+        with patch("bgate_unix.engine.os.lstat", wraps=os.lstat) as lstat:
+            result = deduplicator.process_file(file_path)
+        assert result.result == DedupeResult.UNIQUE
+        assert lstat.call_count == 1
+
+        result = deduplicator.process_file(link)
+        assert result.error == "Validation failed: Symlinks not supported"
+
 
 class TestJournalRecovery:
     """Test journal-based recovery."""
@@ -423,3 +1144,189 @@ class TestJournalRecovery:
         with FileDeduplicator(db_path) as deduper:
             stats = deduper.stats
             assert stats["pending_journal"] == 0
+
+    def test_recovery_commits_once(self, db_path: Path):
+        """Phase updates for many stale entries should share one transaction."""
+        with DedupeDatabase(db_path) as db:
+            for i in range(20):
+                db.journal_move(f"/src/file{i}.txt", f"/dest/file{i}.txt", 1000)
+
+        deduper = FileDeduplicator(db_path)
+        deduper._db.connect()
+        statements: list[str] = []
+        deduper._db.conn.set_trace_callback(statements.append)
+        try:
+            assert deduper._recover_from_journal() == 20
+            assert statements.count("COMMIT") == 1
+            assert not deduper._db.get_incomplete_journal_entries()
+        finally:
+            deduper._db.close()
+
+
+class TestSchemaMigration:
+    """Test schema migrations between versions."""
+
+    def test_v4_fringe_index_rebuilt(self, db_path: Path, temp_dir: Path):
+        """Legacy xxh64 fringe entries should be replaced with xxh3_64 on upgrade."""
+        content = os.urandom(100)
+        file1 = temp_dir / "original.txt"
+        file1.write_bytes(content)
+        other = temp_dir / "other.txt"
+        other.write_bytes(os.urandom(100))
+
+        # A second file of the same size forces both into the fringe index
+        with FileDeduplicator(db_path) as deduper:
+            deduper.process_file(file1)
+            deduper.process_file(other)
+
+        # Downgrade the database to v4 with a stale fringe digest
+        with DedupeDatabase(db_path) as db:
+            db.db.execute("UPDATE fringe_index SET fringe_hash = randomblob(8)")
+            db.db.execute("DELETE FROM schema_version")
+            db.db.execute("INSERT INTO schema_version (version, applied_at) VALUES (4, 'x')")
+
+        file2 = temp_dir / "duplicate.txt"
+        file2.write_bytes(content)
+
+        with FileDeduplicator(db_path) as deduper:
+            assert deduper.stats["schema_version"] == 11
+            assert deduper.stats["fringe_entries"] == 2
+            result = deduper.process_file(file2)
+
+        assert result.result == DedupeResult.DUPLICATE
+        assert result.tier == 3
+
+    def test_v5_size_index_gains_pending_columns(self, db_path: Path):
+        """Upgrading from v5 should add the pending columns and keep known sizes hashed."""
+        with DedupeDatabase(db_path) as db:
+            db.db.execute("DROP TABLE size_index")
+            db.db.execute("CREATE TABLE size_index (file_size INTEGER PRIMARY KEY) WITHOUT ROWID")
+            db.db.execute("INSERT INTO size_index (file_size) VALUES (100)")
+            db.db.execute("DELETE FROM schema_version")
+            db.db.execute("INSERT INTO schema_version (version, applied_at) VALUES (5, 'x')")
+
+        with DedupeDatabase(db_path) as db:
+            assert db.schema_version == 11
+            assert db.size_lookup(100) == (None, None)
+            assert db.get_counts()["pending_hashes"] == 0
+
+    def test_v6_hash_tables_are_rebuilt(self, db_path: Path):
+        """Upgrading from v6 should rebuild both hash tables and keep their keys."""
+        with DedupeDatabase(db_path) as db:
+            db.db.execute("DROP TABLE fringe_index")
+            db.db.execute("DROP TABLE full_index")
+            db.db.execute(
+                "CREATE TABLE fringe_index (fringe_hash BLOB NOT NULL, file_size INTEGER NOT NULL,"
+                " file_path TEXT NOT NULL, PRIMARY KEY (fringe_hash, file_size)) WITHOUT ROWID"
+            )
+            db.db.execute(
+                "CREATE TABLE full_index (full_hash BLOB PRIMARY KEY, file_path TEXT NOT NULL,"
+                " metadata TEXT) WITHOUT ROWID"
+            )
+            db.db.execute("INSERT INTO fringe_index VALUES (x'01', 100, '/a')")
+            db.db.execute("INSERT INTO full_index VALUES (x'02', '/a', NULL)")
+            db.db.execute("DELETE FROM schema_version")
+            db.db.execute("INSERT INTO schema_version (version, applied_at) VALUES (6, 'x')")
+
+        with DedupeDatabase(db_path) as db:
+            assert db.schema_version == 11
+            ddl = dict(
+                db.db.execute(
+                    "SELECT name, sql FROM sqlite_master WHERE name IN "
+                    "('fringe_index', 'full_index')"
+                ).fetchall()
+            )
+            assert "WITHOUT ROWID" not in ddl["full_index"]
+            assert "file_path" not in ddl["fringe_index"]
+            assert db.fringe_exists(b"\x01", 100)
+            assert db.full_lookup(b"\x02") == "/a"
+            assert not db.add_full(b"\x02", "/b")
+
+    def test_v7_fringe_index_drops_file_path(self, db_path: Path):
+        """Upgrading from v7 should drop fringe_index.file_path and keep its keys."""
+        with DedupeDatabase(db_path) as db:
+            db.db.execute("DROP TABLE fringe_index")
+            db.db.execute(
+                "CREATE TABLE fringe_index (fringe_hash BLOB NOT NULL,"
+                " file_size INTEGER NOT NULL, file_path TEXT NOT NULL)"
+            )
+            db.db.execute(
+                "CREATE UNIQUE INDEX idx_fringe_hash_size ON fringe_index(fringe_hash, file_size)"
+            )
+            db.db.execute("INSERT INTO fringe_index VALUES (x'01', 100, '/a')")
+            db.db.execute("DELETE FROM schema_version")
+            db.db.execute("INSERT INTO schema_version (version, applied_at) VALUES (7, 'x')")
+
+        with DedupeDatabase(db_path) as db:
+            assert db.schema_version == 11
+            columns = [row[1] for row in db.db.execute("PRAGMA table_info(fringe_index)")]
+            assert columns == ["fringe_hash", "file_size"]
+            assert db.fringe_exists(b"\x01", 100)
+            assert not db.add_fringe(b"\x01", 100)
+
+    def test_v8_recovery_tables_drop_autoincrement(self, db_path: Path):
+        """Upgrading from v8 should keep recovery rows and stop using sqlite_sequence."""
+        with DedupeDatabase(db_path) as db:
+            db.db.execute("DROP TABLE move_journal")
+            db.db.execute(
+                "CREATE TABLE move_journal (id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " source_path TEXT NOT NULL, dest_path TEXT NOT NULL,"
+                " file_size INTEGER NOT NULL, created_at TEXT NOT NULL,"
+                " phase TEXT NOT NULL DEFAULT 'planned', completed_at TEXT)"
+            )
+            db.db.execute(
+                "INSERT INTO move_journal (id, source_path, dest_path, file_size, created_at)"
+                " VALUES (7, '/src', '/dst', 10, 'x')"
+            )
+            db.db.execute("DELETE FROM schema_version")
+            db.db.execute("INSERT INTO schema_version (version, applied_at) VALUES (8, 'x')")
+
+        with DedupeDatabase(db_path) as db:
+            assert db.schema_version == 11
+            ddl = db.db.execute(
+                "SELECT group_concat(sql) FROM sqlite_master WHERE name IN "
+                "('orphan_registry', 'move_journal')"
+            ).fetchone()[0]
+            assert "AUTOINCREMENT" not in ddl
+            assert db.db.execute("SELECT COUNT(*) FROM sqlite_sequence").fetchone()[0] == 0
+            assert [e["id"] for e in db.get_incomplete_journal_entries()] == [7]
+            assert db.journal_move("/a", "/b", 1) == 8
+
+    def test_v9_fringe_hashes_become_integers(self, db_path: Path):
+        """Upgrading from v9 should rewrite BLOB fringe hashes as integers."""
+        fringe_hash = b"\xff\x01\x02\x03\x04\x05\x06\x87"
+        with DedupeDatabase(db_path) as db:
+            db.db.execute("DROP TABLE fringe_index")
+            db.db.execute(
+                "CREATE TABLE fringe_index (fringe_hash BLOB NOT NULL, file_size INTEGER NOT NULL,"
+                " PRIMARY KEY (fringe_hash, file_size)) WITHOUT ROWID"
+            )
+            db.db.execute("INSERT INTO fringe_index VALUES (?, 100)", [fringe_hash])
+            db.db.execute("DELETE FROM schema_version")
+            db.db.execute("INSERT INTO schema_version (version, applied_at) VALUES (9, 'x')")
+
+        with DedupeDatabase(db_path) as db:
+            assert db.schema_version == 11
+            row = db.db.execute("SELECT typeof(fringe_hash) FROM fringe_index").fetchone()
+            assert row[0] == "integer"
+            assert db.fringe_exists(fringe_hash, 100)
+            assert not db.add_fringe(fringe_hash, 100)
+
+    def test_v10_row_counts_seeded(self, db_path: Path):
+        """Upgrading from v10 should seed row_counts from the existing rows."""
+        with DedupeDatabase(db_path) as db:
+            db.add_size(100, "/pending", None)
+            db.add_size(200)
+            db.add_fringe(b"f" * 8, 200)
+            db.add_full(b"h" * 16, "/a")
+            for name in COUNTER_TRIGGERS:
+                db.db.execute(f"DROP TRIGGER {name}")
+            db.db.execute("DROP TABLE row_counts")
+            db.db.execute("DELETE FROM schema_version")
+            db.db.execute("INSERT INTO schema_version (version, applied_at) VALUES (10, 'x')")
+
+        with DedupeDatabase(db_path) as db:
+            assert db.schema_version == 11
+            counts = db.get_counts()
+            assert (counts["unique_sizes"], counts["pending_hashes"]) == (2, 1)
+            assert (counts["fringe_entries"], counts["full_entries"]) == (1, 1)
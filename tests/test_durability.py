@@ -7,6 +7,7 @@ from pathlib import Path
 from unittest.mock import MagicMock, call, patch
 
 import pytest
+import xxhash
 
 from bgate_unix.db import DedupeDatabase
 from bgate_unix.engine import (
@@ -104,11 +105,15 @@ class TestJournalHygiene:
         with DedupeDatabase(db_path) as db:
             db.connect()
             db.add_full(b"fake_full_hash", "/existing/path")
+            # Known size: skip lazy Tier 1 registration so the file is hashed
+            db.add_size(len(b"content"))
 
-        # Mock _compute_full_hash to return the collision
+        # Mock the (small-file, single-read) hashes to return the collision
         with (
-            patch("bgate_unix.engine._compute_full_hash", return_value=b"fake_full_hash"),
-            patch("bgate_unix.engine._compute_fringe_hash", return_value=b"fake_fringe"),
+            patch(
+                "bgate_unix.engine._compute_both_hashes",
+                return_value=(b"fake_fringe", b"fake_full_hash"),
+            ),
             FileDeduplicator(db_path, processing_dir=processing_dir) as deduper,
         ):
             # process_file should return DUPLICATE
@@ -142,9 +147,13 @@ class TestJournalHygiene:
             db.connect()
             # Register collision
             db.add_full(b"fake_hash", "/existing")
+            db.add_size(len(b"content"))
 
         with (
-            patch("bgate_unix.engine._compute_full_hash", return_value=b"fake_hash"),
+            patch(
+                "bgate_unix.engine._compute_both_hashes",
+                side_effect=lambda path: (_compute_fringe_hash(path), b"fake_hash"),
+            ),
             FileDeduplicator(db_path, processing_dir=processing_dir) as deduper,
         ):
             deduper.process_file(src)
@@ -169,25 +178,24 @@ class TestFringeHashSpec:
         size = FRINGE_SIZE * 3
         path.write_bytes(b"x" * size)
 
-        # Mock Path.open using patch.object on the class specific to the file
-        with patch("pathlib.Path.open") as mock_open:
+        # Mock the hashing opener so the read pattern can be inspected
+        with patch("bgate_unix.engine._open_for_hashing") as mock_open:
             mock_file = MagicMock()
             mock_open.return_value.__enter__.return_value = mock_file
 
             # Setup mock file behavior
             mock_file.seek.return_value = size  # size of file
-            mock_file.read.return_value = b"x" * FRINGE_SIZE
+            mock_file.readinto.return_value = FRINGE_SIZE
 
             # We need to compute hash on 'path', which is a Path object
             _compute_fringe_hash(path)
 
             # Check read calls
             # First read: start of file
-            assert mock_file.read.call_args_list[0] == call(FRINGE_SIZE)
-
             # Second read: tail of file
-            # MUST be called with explicit size, NOT empty args
-            assert mock_file.read.call_args_list[1] == call(FRINGE_SIZE)
+            # Each MUST be bounded to one window, never the rest of the file
+            reads = [len(c.args[0]) for c in mock_file.readinto.call_args_list]
+            assert reads == [FRINGE_SIZE, FRINGE_SIZE]
 
     def test_fringe_overlap_spec(self, temp_dir):
         """Verify overlap logic: 70KB file should read last 64KB (overlap 58KB)."""
@@ -197,11 +205,11 @@ class TestFringeHashSpec:
         size = FRINGE_SIZE + (6 * 1024)
         path.write_bytes(b"x" * size)
 
-        with patch("pathlib.Path.open") as mock_open:
+        with patch("bgate_unix.engine._open_for_hashing") as mock_open:
             mock_file = MagicMock()
             mock_open.return_value.__enter__.return_value = mock_file
             mock_file.seek.return_value = size
-            mock_file.read.return_value = b"x" * FRINGE_SIZE
+            mock_file.readinto.return_value = FRINGE_SIZE
 
             _compute_fringe_hash(path)
 
@@ -271,6 +279,85 @@ class TestSignalGuards:
             # After exit, it should have tried to call the old handler
             mock_original_handler.assert_called_with(signal.SIGINT, None)
 
+    def test_guard_installs_handlers_once(self):
+        """Under signal_guard, critical sections defer signals without swapping handlers."""
+        from bgate_unix.engine import critical_section, signal_guard
+
+        received: list[int] = []
+
+        def handler(signum, _frame):
+            received.append(signum)
+
+        previous = signal.signal(signal.SIGTERM, handler)
+        try:
+            with signal_guard():
+                with patch("signal.signal") as mock_signal_func:
+                    for _ in range(3):
+                        with critical_section():
+                            signal.raise_signal(signal.SIGTERM)
+                            assert received == []
+                        assert received == [signal.SIGTERM]
+                        received.clear()
+                    mock_signal_func.assert_not_called()
+
+                # Outside a critical section the signal is passed straight on
+                signal.raise_signal(signal.SIGTERM)
+                assert received == [signal.SIGTERM]
+
+            assert signal.getsignal(signal.SIGTERM) is handler
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+
+    def test_signal_deferred_at_guard_exit_is_delivered(self):
+        """A signal recorded as the guard unwinds must reach the restored handler."""
+        import bgate_unix.engine
+        from bgate_unix.engine import signal_guard
+
+        received: list[int] = []
+        previous = signal.signal(signal.SIGTERM, lambda signum, _frame: received.append(signum))
+        try:
+            with signal_guard():
+                bgate_unix.engine._deferred_signal = (signal.SIGTERM, None)
+            assert received == [signal.SIGTERM]
+            assert bgate_unix.engine._deferred_signal is None
+            assert bgate_unix.engine._saved_handlers is None
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+
+    def test_guard_finalized_off_main_thread(self):
+        """Exiting the guard on another thread must not raise and must keep passing signals on."""
+        import threading
+
+        import bgate_unix.engine
+        from bgate_unix.engine import signal_guard
+
+        received: list[int] = []
+        handler = lambda signum, _frame: received.append(signum)  # noqa: E731
+        previous = signal.signal(signal.SIGTERM, handler)
+        previous_int = signal.getsignal(signal.SIGINT)
+        errors: list[BaseException] = []
+        guard = signal_guard()
+        guard.__enter__()
+
+        def finalize():
+            try:
+                guard.__exit__(None, None, None)
+            except BaseException as e:
+                errors.append(e)
+
+        try:
+            thread = threading.Thread(target=finalize)
+            thread.start()
+            thread.join()
+            assert errors == []
+
+            signal.raise_signal(signal.SIGTERM)
+            assert received == [signal.SIGTERM]
+        finally:
+            bgate_unix.engine._saved_handlers = None
+            signal.signal(signal.SIGTERM, previous)
+            signal.signal(signal.SIGINT, previous_int)
+
 
 class TestLayout:
     """Test filesystem layout structure."""
@@ -297,6 +384,21 @@ class TestLayout:
             files = list(shard_dir.iterdir())
             assert len(files) == 1
 
+    def test_hashed_file_named_from_full_hash(self, db_path, processing_dir, temp_dir):
+        """A file indexed with its full hash lands at <hash[0]>/<hash[1:8]><suffix>."""
+        first = temp_dir / "first.txt"
+        first.write_bytes(b"content-a")
+        second = temp_dir / "second.txt"
+        second.write_bytes(b"content-b")
+        full_hash = xxhash.xxh3_128_digest(b"content-b")
+
+        with FileDeduplicator(db_path, processing_dir=processing_dir) as deduper:
+            deduper.process_file(first)
+            result = deduper.process_file(second)
+
+        hex_val = full_hash.hex()
+        assert result.stored_path == processing_dir / hex_val[:2] / f"{hex_val[2:16]}.txt"
+
 
 class TestOrphanIdempotency:
     """Test orphan registry idempotency."""
@@ -319,6 +421,19 @@ class TestOrphanIdempotency:
             assert orphans[0]["orphan_path"] == "/orphan/file.txt"
             assert orphans[0]["original_path"] == "/original/path1"  # First one wins
 
+    @pytest.mark.parametrize("has_returning", [True, False])
+    def test_duplicate_orphan_returns_existing_id(self, db_path, has_returning):
+        """Re-registering an orphan path should return the original row's id."""
+        with (
+            patch("bgate_unix.db.HAS_RETURNING", has_returning),
+            DedupeDatabase(db_path) as db,
+        ):
+            id1 = db.add_orphan("/original/path1", "/orphan/file.txt", 100)
+            assert db.add_orphan("/original/path2", "/orphan/file.txt", 200) == id1
+            db.update_orphan_status(id1, "recovered")
+            assert db.add_orphan("/original/path3", "/orphan/file.txt", 300) == id1
+            assert db.get_orphan_count() == 0
+
     def test_different_orphan_paths_allowed(self, db_path):
         """Verify different orphan_path entries are allowed."""
         with DedupeDatabase(db_path) as db:
@@ -334,6 +449,60 @@ class TestOrphanIdempotency:
             orphans = db.get_pending_orphans()
             assert len(orphans) == 2
 
+    def test_iter_pending_orphans_streams_in_batches(self, db_path):
+        """Streaming should yield every pending orphan across fetchmany() batches."""
+        with DedupeDatabase(db_path) as db:
+            ids = [db.add_orphan(f"/original/{i}", f"/orphan/{i}.txt", i) for i in range(5)]
+            db.update_orphan_status(ids[0], "failed")
+
+            with patch("bgate_unix.db.FETCH_SIZE", 2):
+                streamed = list(db.iter_pending_orphans())
+
+            assert streamed == [
+                (r["id"], r["original_path"], r["orphan_path"]) for r in db.get_pending_orphans()
+            ]
+            assert len(streamed) == 4
+
+    def test_recover_orphans_commits_statuses_once(self, db_path, temp_dir):
+        """One recovery pass should settle every orphan's status in a single commit."""
+        with DedupeDatabase(db_path) as db:
+            for i in range(3):
+                orphan = temp_dir / f"orphan{i}.txt"
+                orphan.write_bytes(b"data")
+                db.add_orphan(str(temp_dir / f"home{i}.txt"), str(orphan), 4)
+            db.add_orphan(str(temp_dir / "home_gone.txt"), str(temp_dir / "gone.txt"), 4)
+
+        # Connect without the automatic recovery pass so it can be traced
+        deduper = FileDeduplicator(db_path)
+        deduper._db.connect()
+        deduper._connected = True
+        statements: list[str] = []
+        deduper._db.conn.set_trace_callback(statements.append)
+        try:
+            assert deduper.recover_orphans() == {"recovered": 3, "failed": 1, "total": 4}
+            assert statements.count("COMMIT") == 1
+            assert deduper._db.get_orphan_count() == 0
+        finally:
+            deduper.close()
+
+        for i in range(3):
+            assert (temp_dir / f"home{i}.txt").exists()
+
+    def test_recover_missing_orphan_creates_no_directories(self, db_path, temp_dir):
+        """A missing orphan is marked failed without creating its original parent dirs."""
+        with DedupeDatabase(db_path) as db:
+            db.add_orphan(str(temp_dir / "gone" / "deep" / "home.txt"), str(temp_dir / "x.txt"), 4)
+
+        deduper = FileDeduplicator(db_path)
+        deduper._db.connect()
+        deduper._connected = True
+        try:
+            assert deduper.recover_orphans() == {"recovered": 0, "failed": 1, "total": 1}
+        finally:
+            deduper.close()
+
+        assert not (temp_dir / "gone").exists()
+
     def test_process_result_api_shape(self, db_path, processing_dir, temp_dir):
         """Verify ProcessResult contains both original and stored paths (GPT Point 1)."""
         src = temp_dir / "unique.txt"
@@ -375,3 +544,34 @@ class TestOrphanIdempotency:
 
         # Original content must remain intact because replace didn't happen
         assert emergency_file.read_text() == content
+
+
+class TestJournalRollbackSyncs:
+    """Test directory syncs during journal rollback."""
+
+    def test_rollback_syncs_each_dest_dir_once(self, db_path, processing_dir, temp_dir):
+        """Source dirs sync before each unlink; shared dest dirs sync once at the end."""
+        shard = processing_dir / "ab"
+        shard.mkdir()
+        with DedupeDatabase(db_path) as db:
+            for i in range(3):
+                dest = shard / f"file{i}.bin"
+                dest.write_bytes(b"moved")
+                journal_id = db.journal_move(str(temp_dir / f"file{i}.bin"), str(dest), 5)
+                db.update_move_phase(journal_id, "moving")
+
+        with patch("bgate_unix.engine._fsync_dir") as mock_fsync:
+            deduper = FileDeduplicator(db_path, processing_dir=processing_dir)
+            deduper._db.connect()
+            try:
+                assert deduper._recover_from_journal() == 3
+            finally:
+                deduper._db.close()
+
+        assert mock_fsync.call_args_list == [call(temp_dir)] * 3 + [call(shard)]
+        assert sorted(p.name for p in temp_dir.glob("file*.bin")) == [
+            "file0.bin",
+            "file1.bin",
+            "file2.bin",
+        ]
+        assert not list(shard.iterdir())
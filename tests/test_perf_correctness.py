@@ -4,13 +4,30 @@ Focuses on fsync counts, sharding behavior, and batch I/O.
 """
 
 import contextlib
+import os
 import tempfile
 from pathlib import Path
 from unittest.mock import call, patch
 
 import pytest
 
-from bgate_unix.engine import FileDeduplicator
+from bgate_unix.cli import _LINE_ENCODER, _result_line, _result_record
+from bgate_unix.engine import (
+    CHUNK_SIZE,
+    DIR_FD_CACHE_SIZE,
+    FRINGE_SIZE,
+    RANDOM_POOL_SIZE,
+    DedupeResult,
+    FileDeduplicator,
+    ProcessResult,
+    _compute_both_hashes,
+    _compute_fringe_hash,
+    _compute_full_hash,
+    _fsync_dir,
+    _IgnoreRules,
+    _take_random,
+    dir_fd_cache,
+)
 
 
 @pytest.fixture
@@ -43,29 +60,59 @@ class TestPerfOptimizations:
 
         # Test 2: Existing shard creation -> Should NOT fsync parent
         src2 = temp_dir / "file2.txt"
-        src2.write_bytes(b"content2")
+        # Distinct size: stays at Tier 1 unhashed, so the shard comes from the random pool
+        src2.write_bytes(b"content-2")
 
-        # Refactor: Avoid global Path.mkdir patch.
-        # Deterministically force a specific shard ID by mocking uuid or hash computation.
-        # If hash is not pre-computed, code uses UUID.
-        # Let's mock uuid.uuid4 to return a known hex.
-
-        known_uuid_hex = "aa" + "0" * 30
+        # Force a known shard by pinning the random bytes used for unhashed names
         shard_name = "aa"
         (processing_dir / shard_name).mkdir(exist_ok=True)
 
         with (
             patch("bgate_unix.engine._fsync_dir") as mock_fsync,
             patch("bgate_unix.engine.atomic_move"),
-            patch("uuid.uuid4") as mock_uuid,
+            patch("bgate_unix.engine._take_random", return_value=b"\xaa" + bytes(7)),
         ):
-            mock_uuid.return_value.hex = known_uuid_hex
             deduper.process_file(src2)
 
             # Should NOT have synced processing_dir because mkdir logic handles existing dir
             # Note: since we didn't mock mkdir globally, real mkdir runs and raises FileExistsError naturally
             assert call(processing_dir) not in mock_fsync.call_args_list
 
+    def test_known_shard_skips_mkdir(self, temp_dir):
+        """Shards seen at connect or created earlier in the run are not mkdir()'ed again."""
+        db_path = temp_dir / "db.sqlite"
+        processing_dir = temp_dir / "processing"
+        (processing_dir / "bb").mkdir(parents=True)
+        sources = []
+        for i in range(3):
+            src = temp_dir / f"file{i}.txt"
+            src.write_bytes(b"x" * (i + 1))
+            sources.append(src)
+
+        created: list[Path] = []
+        real_mkdir = Path.mkdir
+
+        def tracking_mkdir(self, *args, **kwargs):
+            created.append(self)
+            return real_mkdir(self, *args, **kwargs)
+
+        def shard_bytes(prefix):
+            return lambda n: prefix + os.urandom(n - 1)
+
+        with (
+            FileDeduplicator(db_path, processing_dir=processing_dir) as deduper,
+            patch.object(Path, "mkdir", tracking_mkdir),
+        ):
+            with patch("bgate_unix.engine._take_random", side_effect=shard_bytes(b"\xaa")):
+                deduper.process_file(sources[0])
+                deduper.process_file(sources[1])
+            with patch("bgate_unix.engine._take_random", side_effect=shard_bytes(b"\xbb")):
+                deduper.process_file(sources[2])
+
+        assert created == [processing_dir / "aa"]
+        assert len(list((processing_dir / "aa").iterdir())) == 2
+        assert len(list((processing_dir / "bb").iterdir())) == 1
+
     def test_emergency_orphan_batch_fsync(self, temp_dir):
         """Verify emergency orphan rewrite uses single batch fsync."""
         processing_dir = temp_dir / "processing"
@@ -142,6 +189,117 @@ class TestPerfOptimizations:
             assert emergency_file.read_text() == original_content
 
 
+class TestDeferredDirectorySyncs:
+    def test_source_directory_synced_once_per_scan(self, temp_dir):
+        """Moving many files out of one directory should fsync it once, after the moves."""
+        db_path = temp_dir / "db.sqlite"
+        processing_dir = temp_dir / "processing"
+        processing_dir.mkdir()
+        source_dir = temp_dir / "incoming"
+        source_dir.mkdir()
+        for i in range(3):
+            (source_dir / f"file{i}.txt").write_bytes(b"x" * (i + 1))
+
+        with (
+            patch("bgate_unix.engine._fsync_dir") as mock_fsync,
+            FileDeduplicator(db_path, processing_dir=processing_dir) as deduper,
+        ):
+            results = list(deduper.process_directory(source_dir))
+
+            assert len(results) == 3
+            assert not any(source_dir.iterdir())
+            assert mock_fsync.call_args_list.count(call(source_dir)) == 1
+            assert mock_fsync.call_args_list[-1] == call(source_dir)
+
+
+class TestDirFdCache:
+    def test_directory_opened_once_per_scan(self, temp_dir):
+        """Repeated syncs of one directory reuse its fd; evicted and leftover fds are closed."""
+        dirs = [temp_dir / f"d{i}" for i in range(DIR_FD_CACHE_SIZE + 1)]
+        for d in dirs:
+            d.mkdir()
+
+        with (
+            patch("bgate_unix.engine.os.open", wraps=os.open) as mock_open,
+            patch("bgate_unix.engine.os.close", wraps=os.close) as mock_close,
+        ):
+            with dir_fd_cache():
+                for _ in range(3):
+                    _fsync_dir(dirs[0])
+                assert mock_open.call_count == 1
+
+                for d in dirs[1:]:
+                    _fsync_dir(d)
+                # dirs[0] was least recently used and made room for the last one
+                assert mock_close.call_count == 1
+
+            assert mock_close.call_count == mock_open.call_count == DIR_FD_CACHE_SIZE + 1
+
+
+class TestRandomPool:
+    def test_pool_refills_with_one_urandom_call(self):
+        """Unhashed processing names draw from a pooled urandom() read, not one syscall each."""
+        with patch("bgate_unix.engine.os.urandom", wraps=os.urandom) as urandom:
+            names = {_take_random(8) for _ in range(RANDOM_POOL_SIZE // 8)}
+
+        assert urandom.call_count <= 1
+        assert len(names) == RANDOM_POOL_SIZE // 8
+
+
+class TestIgnoreRulesCache:
+    def test_walks_share_compiled_rules(self, temp_dir):
+        """Walks with the same ignore set should reuse one compiled _IgnoreRules."""
+        (temp_dir / "a.txt").write_bytes(b"a")
+        with (
+            patch.object(FileDeduplicator, "_process_directory_scandir") as mock_walk,
+            FileDeduplicator(temp_dir / "db.sqlite") as deduper,
+        ):
+            mock_walk.return_value = iter(())
+            list(deduper.process_directory(temp_dir, ignore_patterns=["*.tmp"]))
+            list(deduper.process_directory(temp_dir, ignore_patterns=["*.tmp"]))
+
+        first, second = (c.args[2] for c in mock_walk.call_args_list)
+        assert isinstance(first, _IgnoreRules)
+        assert first is second
+
+
+class TestPageCacheAdvice:
+    def _advice(self, mock_fadvise) -> list[int]:
+        return [c.args[3] for c in mock_fadvise.call_args_list]
+
+    def test_large_files_dropped_after_hashing(self, temp_dir):
+        """Files of at least DROP_CACHE_SIZE should be released from the page cache."""
+        large = temp_dir / "large.bin"
+        large.write_bytes(os.urandom(CHUNK_SIZE * 2))
+        small = temp_dir / "small.bin"
+        small.write_bytes(os.urandom(CHUNK_SIZE + 1))
+
+        with (
+            patch("bgate_unix.engine.DROP_CACHE_SIZE", CHUNK_SIZE * 2),
+            patch("bgate_unix.engine.os.posix_fadvise") as mock_fadvise,
+        ):
+            for hash_file in (_compute_full_hash, _compute_both_hashes):
+                mock_fadvise.reset_mock()
+                hash_file(large)
+                assert os.POSIX_FADV_DONTNEED in self._advice(mock_fadvise)
+                mock_fadvise.reset_mock()
+                hash_file(small)
+                assert os.POSIX_FADV_DONTNEED not in self._advice(mock_fadvise)
+
+    def test_fringe_reads_disable_readahead(self, temp_dir):
+        """Only files with a gap between the fringe windows should skip readahead."""
+        path = temp_dir / "fringe.bin"
+        with patch("bgate_unix.engine.os.posix_fadvise") as mock_fadvise:
+            path.write_bytes(os.urandom(FRINGE_SIZE * 3))
+            _compute_fringe_hash(path)
+            assert self._advice(mock_fadvise) == [os.POSIX_FADV_RANDOM]
+
+            mock_fadvise.reset_mock()
+            path.write_bytes(os.urandom(FRINGE_SIZE * 2))
+            _compute_fringe_hash(path)
+            mock_fadvise.assert_not_called()
+
+
 class TestShardFailureLogging:
     def test_shard_pre_create_failure_logs(self, temp_dir, caplog):
         """Verify debug log emitted when shard pre-create fails."""
@@ -174,3 +332,37 @@ class TestShardFailureLogging:
             args = mock_logger.error.call_args[0]
             assert "Shard pre-create failed" in args[0]
             assert "Denied" in str(args[2])
+
+
+class TestResultLines:
+    @pytest.mark.parametrize(
+        "result",
+        [
+            ProcessResult(
+                path=Path("/vault/ab/cd.pdf"),
+                original_path=Path('/in/caf\u00e9 "quoted" \u6587\u4ef6.pdf'),
+                result=DedupeResult.UNIQUE,
+                tier=3,
+                tags={"owner": "Zo\u00eb", 'say "hi"': "back\\slash\ttab", "emoji": "\U0001f600"},
+            ),
+            ProcessResult(
+                path=None,  # type: ignore[arg-type]
+                original_path=Path('/in/dup\\"x"\n.bin'),
+                result=DedupeResult.DUPLICATE,
+                tier=2,
+                duplicate_of=Path("/vault/\u00fc.bin"),
+            ),
+            ProcessResult(
+                path=Path("/in/empty"),
+                original_path=Path("/in/empty"),
+                result=DedupeResult.SKIPPED,
+                tier=0,
+                tags={},
+                error='Permission "denied" \u2013 r\u00e9essayer',
+            ),
+        ],
+    )
+    def test_result_line_matches_encoded_record(self, result):
+        """The hand-built NDJSON line must equal encoding the full record dict."""
+        expected = _LINE_ENCODER.encode({"type": "result", **_result_record(result)}) + "\n"
+        assert _result_line(result) == expected